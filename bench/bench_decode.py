@@ -0,0 +1,51 @@
+"""
+Micro-benchmark: per-row tip decoding vs. the bulk decode_tips() path.
+
+    python -m bench.bench_decode --tips 50000
+"""
+import argparse
+import copy
+import time
+from datetime import datetime
+
+from mock.server import generate_tips
+from schema.hunch_club import TipSchema, decode_tips
+
+
+def decode_per_row(data):
+    """
+    The previous get_tips() path: strptime, copy _id, build a model and dump it back, row by row.
+    """
+    new_data = []
+    for tip in data:
+        tip['datetime'] = datetime.strptime(tip['datetime'], "%Y-%m-%d %H:%M:%S")
+        tip['id'] = str(tip['_id'])
+        new_data.append(TipSchema(**tip).model_dump())
+    return new_data
+
+
+def bench(func, data, repeat):
+    best = None
+    for _ in range(repeat):
+        _data = copy.deepcopy(data)
+        start = time.perf_counter()
+        func(_data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tips", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = list(generate_tips(args.tips).values())
+    assert decode_per_row(copy.deepcopy(data)) == decode_tips(copy.deepcopy(data))[0]
+
+    per_row = bench(decode_per_row, data, args.repeat)
+    bulk = bench(decode_tips, data, args.repeat)
+    print(f"{args.tips} tips, best of {args.repeat}")
+    print(f"  per-row:     {per_row * 1000:8.1f} ms")
+    print(f"  decode_tips: {bulk * 1000:8.1f} ms  ({per_row / bulk:.1f}x)")
@@ -0,0 +1,189 @@
+"""
+End-to-end page benchmark: runs the admin pages headlessly (Streamlit AppTest) against the mock API.
+
+    python -m bench.bench_pages --scenario medium --latency 50
+    python -m bench.bench_pages --tips 200000 --platforms 500 --json results.json
+
+For each page it reports the cold run (empty caches), warm reruns and an interaction rerun,
+with the API calls each made and the process's peak RSS. Exits with status 1 if a result
+is over its threshold, so it can run in CI.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dataset sizes, and per-scenario thresholds: warm rerun p95 (ms), API calls per warm rerun, peak RSS (MB)
+SCENARIOS = {
+    "small": {"tips": 1_000, "platforms": 10, "rerun_ms": 500, "warm_calls": 0, "rss_mb": 500},
+    "medium": {"tips": 50_000, "platforms": 200, "rerun_ms": 1_500, "warm_calls": 0, "rss_mb": 1_500},
+    "large": {"tips": 500_000, "platforms": 2_000, "rerun_ms": 6_000, "warm_calls": 0, "rss_mb": 6_000},
+}
+
+# Page script, and the interaction rerun to measure on it (given the AppTest and the mock's state).
+# Selectboxes with a format_func are set by value: AppTest's select_index() passes the label instead.
+PAGES = {
+    "dashboard": ("pages/dashboard.py", None),
+    "tips": ("pages/hunch_club_tips.py", lambda at, state: at.number_input(key="previous_tips_page").increment()),
+    "platforms": ("pages/hunch_club_platforms.py", lambda at, state: at.selectbox(key="hunch_club_selected_platform").set_value(str(next(iter(state.platforms))))),
+}
+
+# Runs the page given in BENCH_PAGE, so the repo's page files are benchmarked as they are
+DRIVER = """
+import os, runpy
+runpy.run_path(os.environ["BENCH_PAGE"], run_name="__main__")
+"""
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def setup(workdir, port):
+    """
+    Lays out workdir as an app folder pointing at the mock API: secrets, pages/ and a driver script.
+    AppTest reads .streamlit/secrets.toml from the working directory, and st.page_link checks that
+    linked pages exist next to the main script, so the repo's pages are copied in (the driver still
+    runs the originals).
+    """
+    os.makedirs(os.path.join(workdir, ".streamlit"), exist_ok=True)
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w") as f:
+        f.write(f'API_SERVER_ADDRESS = "http://127.0.0.1:{port}/"\nDEBUG = false\nAPP_PASSWORD = "bench"\nAPI_TOKEN = "bench"\n')
+    shutil.copytree(os.path.join(ROOT, "pages"), os.path.join(workdir, "pages"), ignore=shutil.ignore_patterns("__pycache__"))
+    driver = os.path.join(workdir, "driver.py")
+    with open(driver, "w") as f:
+        f.write(DRIVER)
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    return driver
+
+
+def reset_caches():
+    """
+    Empties every cache between pages, so each cold run really starts cold.
+    """
+    import streamlit as st
+    from core.cache import get_cache
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    get_cache().invalidate("")
+
+
+def api_calls(calls):
+    # The health monitor's pings run on their own schedule, not per rerun
+    return sum(n for route, n in calls.items() if route != "common/ping")
+
+
+def timed_run(at, state, action=None):
+    """
+    Runs (or reruns) the app once. Returns (ms, API calls made).
+    """
+    before = api_calls(state.calls)
+    if action:
+        action(at, state)
+    start = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed, api_calls(state.calls) - before
+
+
+def bench_page(driver, page, action, state, reruns):
+    from streamlit.testing.v1 import AppTest
+    reset_caches()
+    os.environ["BENCH_PAGE"] = os.path.join(ROOT, page)
+    at = AppTest.from_file(driver, default_timeout=600)
+    at.session_state["super_admin"] = True
+    at.session_state["access_token"] = "bench"
+
+    cold_ms, cold_calls = timed_run(at, state)
+    warm = [timed_run(at, state) for _ in range(reruns)]
+    result = {
+        "cold_ms": round(cold_ms, 1),
+        "cold_calls": cold_calls,
+        "warm_p50_ms": round(statistics.median(ms for ms, _ in warm), 1),
+        "warm_p95_ms": round(sorted(ms for ms, _ in warm)[max(0, int(len(warm) * 0.95) - 1)], 1),
+        "warm_calls": max(n for _, n in warm),
+    }
+    if action:
+        result["interaction_ms"], result["interaction_calls"] = (round(v, 1) for v in timed_run(at, state, action))
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return result
+
+
+def check(results, thresholds):
+    """
+    Returns a list of threshold violations.
+    """
+    failures = []
+    for page, result in results.items():
+        if "error" in result:
+            failures.append(f"{page}: {result['error']}")
+            continue
+        if result["warm_p95_ms"] > thresholds["rerun_ms"]:
+            failures.append(f"{page}: warm rerun p95 {result['warm_p95_ms']} ms > {thresholds['rerun_ms']} ms")
+        if result["warm_calls"] > thresholds["warm_calls"]:
+            failures.append(f"{page}: {result['warm_calls']} API calls on a warm rerun > {thresholds['warm_calls']}")
+        if result["peak_rss_mb"] > thresholds["rss_mb"]:
+            failures.append(f"{page}: peak RSS {result['peak_rss_mb']} MB > {thresholds['rss_mb']} MB")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS, default="small", help="Dataset size and thresholds")
+    parser.add_argument("--tips", type=int, help="Override the scenario's number of tips")
+    parser.add_argument("--platforms", type=int, help="Override the scenario's number of platforms")
+    parser.add_argument("--latency", type=float, default=0, help="Milliseconds the mock API adds to every response")
+    parser.add_argument("--reruns", type=int, default=5, help="Warm reruns per page")
+    parser.add_argument("--pages", nargs="+", choices=PAGES, default=list(PAGES))
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.json: args.json = os.path.abspath(args.json)
+    scenario = dict(SCENARIOS[args.scenario])
+    if args.tips is not None: scenario["tips"] = args.tips
+    if args.platforms is not None: scenario["platforms"] = args.platforms
+
+    from mock.server import make_server
+    print(f"Generating {scenario['tips']} tips and {scenario['platforms']} platforms...")
+    server = make_server("127.0.0.1", 0, tips=scenario["tips"], platforms=scenario["platforms"], latency=args.latency / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        driver = setup(workdir, port)
+        results = {}
+        for name in args.pages:
+            page, action = PAGES[name]
+            try:
+                results[name] = bench_page(driver, page, action, server.RequestHandlerClass.state, args.reruns)
+            except RuntimeError as e:
+                results[name] = {"error": str(e)}
+        os.chdir(ROOT)
+
+    columns = ["cold_ms", "cold_calls", "warm_p50_ms", "warm_p95_ms", "warm_calls", "interaction_ms", "interaction_calls", "peak_rss_mb"]
+    print(f"\n{args.scenario}: {scenario['tips']} tips, {scenario['platforms']} platforms, {args.latency:g} ms latency, {args.reruns} warm reruns")
+    print(f"{'page':<10}" + "".join(f"{c:>18}" for c in columns))
+    for name, result in results.items():
+        print(f"{name:<10}" + "".join(f"{str(result.get(c, '-')):>18}" for c in columns))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scenario": args.scenario, "latency_ms": args.latency, **scenario, "results": results}, f, indent=2)
+
+    failures = check(results, scenario)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
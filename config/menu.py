@@ -13,6 +13,9 @@ def sidebar_menu():
     st.sidebar.page_link("pages/hunch_club_tips.py", label="Tips", icon="🎟️")
     st.sidebar.page_link("pages/hunch_club_platforms.py", label="Publish", icon="📬")
 
+    st.sidebar.caption("Admin")
+    st.sidebar.page_link("pages/diagnostics.py", label="Diagnostics", icon="🩺")
+
 
     
     
\ No newline at end of file
@@ -0,0 +1,290 @@
+import os
+import time
+import pickle
+import sqlite3
+import threading
+import hashlib
+import functools
+from contextlib import contextmanager
+from loguru import logger as log
+
+from core.vars import CACHE_BACKEND, CACHE_PATH
+from core.metrics import metrics
+from core.snapshot import save_value, load_value
+
+
+class MemoryBackend:
+    """
+    Cache entries kept in this process, shared by all sessions of this replica.
+    Entries older than their max_age (ttl + stale_ttl) can never be served again: they are dropped when
+    looked up, and swept out on a write at most every sweep_interval seconds.
+    """
+    sweep_interval = 60
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.next_sweep = time.time() + self.sweep_interval
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at, expires = entry
+        if time.time() >= expires:
+            with self.lock:
+                if self.entries.get(key) is entry:
+                    del self.entries[key]
+            return None
+        return value, stored_at
+
+    def set(self, key, value, stored_at, max_age=None):
+        now = time.time()
+        with self.lock:
+            self.entries[key] = (value, stored_at, stored_at + max_age if max_age is not None else float("inf"))
+            if now >= self.next_sweep:
+                self.next_sweep = now + self.sweep_interval
+                for k in [k for k, entry in self.entries.items() if now >= entry[2]]:
+                    del self.entries[k]
+
+    def delete(self, prefix):
+        with self.lock:
+            for key in [k for k in self.entries if k.startswith(prefix)]:
+                del self.entries[key]
+
+    def acquire(self, key, ttl):
+        # In-process single-flight is handled by Cache's per-key locks
+        return True
+
+    def release(self, key):
+        pass
+
+
+class SQLiteBackend:
+    """
+    Cache entries in a SQLite file, shared by every replica that mounts the same volume.
+    Fetch leases stop replicas from refreshing the same key at the same time.
+    Values are pickled, so the file must only be writable by this app: loading it runs whatever it contains.
+    Rows past their max_age are skipped on lookup and deleted on a write at most every sweep_interval seconds.
+    """
+    sweep_interval = 60
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.local = threading.local()
+        self.next_sweep = time.time() + self.sweep_interval
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, stored_at REAL, expires REAL)")
+        # Files written before entries expired have no expires column; their rows are kept until replaced
+        if "expires" not in [row[1] for row in conn.execute("PRAGMA table_info(cache)")]:
+            conn.execute("ALTER TABLE cache ADD COLUMN expires REAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires REAL)")
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections can't be shared between threads
+        if not getattr(self.local, "conn", None):
+            self.local.conn = sqlite3.connect(self.path, timeout=5)
+        return self.local.conn
+
+    def get(self, key):
+        row = self._conn().execute("SELECT value, stored_at FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())).fetchone()
+        return (pickle.loads(row[0]), row[1]) if row else None
+
+    def set(self, key, value, stored_at, max_age=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, stored_at, expires) VALUES (?, ?, ?, ?)",
+                     (key, pickle.dumps(value), stored_at, stored_at + max_age if max_age is not None else None))
+        if now >= self.next_sweep:
+            self.next_sweep = now + self.sweep_interval
+            conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+        conn.commit()
+
+    def delete(self, prefix):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+        conn.commit()
+
+    def acquire(self, key, ttl):
+        conn = self._conn()
+        conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, time.time()))
+        acquired = conn.execute("INSERT OR IGNORE INTO leases (key, expires) VALUES (?, ?)", (key, time.time() + ttl)).rowcount == 1
+        conn.commit()
+        return acquired
+
+    def release(self, key):
+        conn = self._conn()
+        conn.execute("DELETE FROM leases WHERE key = ?", (key,))
+        conn.commit()
+
+
+class Cache:
+    """
+    Read-through cache for API fetchers, with single-flight fetches and stale-while-revalidate.
+        Fresh (age < ttl): served from the cache.
+        Stale (age < ttl + stale_ttl): served from the cache while one background thread refreshes it.
+        Missing or expired: fetched once; concurrent callers for the same key wait for that fetch.
+    None results (failed fetches) are never stored. Per-key locks only live while a fetch holds or waits on them.
+    """
+    lease_ttl = 30
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.refreshing = set()
+        self.seeded = set()
+
+    @contextmanager
+    def _key_lock(self, key):
+        # key_locks maps key -> [lock, holders]; the last holder out removes it
+        with self.lock:
+            entry = self.key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.key_locks[key]
+
+    def _fetch(self, key, fetch, max_age):
+        # Another replica holds the lease: give it a moment to store the value before fetching ourselves
+        leased = self.backend.acquire(key, self.lease_ttl)
+        if not leased:
+            for _ in range(20):
+                time.sleep(0.25)
+                entry = self.backend.get(key)
+                if entry and time.time() - entry[1] < self.lease_ttl:
+                    return entry[0]
+        try:
+            value = fetch()
+            if value is not None:
+                self.backend.set(key, value, time.time(), max_age)
+            return value
+        finally:
+            # Only drop our own lease, never the one the other replica is still fetching under
+            if leased:
+                self.backend.release(key)
+
+    def _refresh(self, key, fetch, max_age):
+        try:
+            with self._key_lock(key):
+                self._fetch(key, fetch, max_age)
+        except Exception as e:
+            log.error(e)
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def get_or_fetch(self, key, fetch, ttl, stale_ttl=0):
+        # Metrics are labelled per fetcher, not per argument set
+        name = key.split("|", 1)[0]
+        entry = self.backend.get(key)
+        if entry:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < ttl:
+                metrics.inc("cache_requests_total", help="Shared cache lookups by result", cache=name, result="hit")
+                return value
+            if age < ttl + stale_ttl:
+                metrics.inc("cache_requests_total", cache=name, result="stale")
+                with self.lock:
+                    start = key not in self.refreshing
+                    self.refreshing.add(key)
+                if start:
+                    threading.Thread(target=self._refresh, args=(key, fetch, ttl + stale_ttl), daemon=True).start()
+                return value
+
+        with self._key_lock(key):
+            # Someone else may have fetched it while we waited
+            entry = self.backend.get(key)
+            if entry and time.time() - entry[1] < ttl:
+                metrics.inc("cache_requests_total", cache=name, result="hit")
+                return entry[0]
+            metrics.inc("cache_requests_total", cache=name, result="miss")
+            with metrics.timer("cache_fetch_duration_seconds", help="Time spent fetching on a cache miss", cache=name):
+                return self._fetch(key, fetch, ttl + stale_ttl)
+
+    def invalidate(self, prefix):
+        self.backend.delete(prefix)
+
+    def seed(self, key, snapshot, ttl, stale_ttl=0):
+        """
+        Fills a missing entry from its on-disk snapshot, once per process. The entry is dated ttl ago,
+        so it is served as stale straight away and refreshed in the background.
+        """
+        with self.lock:
+            if key in self.seeded: return
+            self.seeded.add(key)
+        if self.backend.get(key) is not None:
+            return
+        value, meta = load_value(snapshot)
+        if value is not None and meta.get("key") == key:
+            self.backend.set(key, value, time.time() - ttl, ttl + stale_ttl)
+            log.info(f"Cache entry {key} loaded from snapshot saved at {time.ctime(meta['saved_at'])}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Returns the process-wide cache, using the backend set by CACHE_BACKEND ("memory" or "sqlite").
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                backend = SQLiteBackend(CACHE_PATH) if CACHE_BACKEND == "sqlite" else MemoryBackend()
+                _cache = Cache(backend)
+    return _cache
+
+
+def snapshot_name(key):
+    return f"cache-{hashlib.sha1(key.encode()).hexdigest()[:16]}"
+
+
+def cached(ttl=60, stale_ttl=0, snapshot=False):
+    """
+    Decorator caching a fetcher's result in the shared cache, keyed by its arguments.
+    A drop-in for st.cache_resource on API reads: fn.clear() invalidates every key of fn,
+    fn.clear(*args) only the key for those arguments.
+        ttl: int = Seconds a result is served as fresh.
+        stale_ttl: int = Extra seconds a result is served while it is refreshed in the background.
+        snapshot: bool = Also keep the last result on disk (SNAPSHOT_DIR, JSON-serializable results only),
+            so after a restart it is served as stale at once instead of waiting for the API.
+    """
+    def decorator(func):
+        # Pages run as __main__, so key on the file name rather than the module
+        prefix = f"{os.path.basename(func.__code__.co_filename)}:{func.__qualname__}|"
+
+        def make_key(args, kwargs):
+            return f"{prefix}{args!r}{sorted(kwargs.items())!r}"
+
+        def fetch_and_save(key, args, kwargs):
+            value = func(*args, **kwargs)
+            if value is not None:
+                save_value(snapshot_name(key), value, key=key)
+            return value
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            if snapshot:
+                get_cache().seed(key, snapshot_name(key), ttl, stale_ttl)
+                return get_cache().get_or_fetch(key, lambda: fetch_and_save(key, args, kwargs), ttl, stale_ttl)
+            return get_cache().get_or_fetch(key, lambda: func(*args, **kwargs), ttl, stale_ttl)
+
+        def clear(*args, **kwargs):
+            get_cache().invalidate(make_key(args, kwargs) if args or kwargs else prefix)
+
+        wrapper.clear = clear
+        return wrapper
+    return decorator
@@ -0,0 +1,293 @@
+import re
+import json
+import codecs
+import time
+import random
+import threading
+import requests
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from loguru import logger as log
+
+from core.vars import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE
+from core.vars import HTTP_MAX_RETRIES, HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN
+from core.metrics import metrics, SIZE_BUCKETS
+
+# Default (connect, read) timeout used for every API call.
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the process-wide HTTP session shared by all Streamlit sessions.
+    Connections to the API server are pooled and kept alive between calls, so reruns reuse
+    open TCP/TLS connections instead of reconnecting for every request.
+    Responses are asked for compressed (requests' default Accept-Encoding: gzip and deflate, plus br
+    when brotli is installed) and decoded transparently, streamed bodies included.
+    Kept as a module-level singleton rather than st.cache_resource so worker and background
+    threads (which have no ScriptRunContext) get the same session.
+        pool_connections: int = Number of per-host pools kept (HTTP_POOL_CONNECTIONS).
+        pool_maxsize: int = Max open connections kept per host (HTTP_POOL_MAXSIZE).
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({"Connection": "keep-alive"})
+                _session = session
+    return _session
+
+
+# Retry policy
+RETRY_STATUSES = {429, 502, 503, 504}
+# Methods that are safe to repeat. PATCH/POST are only retried when sent with an idempotency key.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails fast for an endpoint that keeps failing.
+    After threshold failures in a row the circuit opens and calls are refused for cooldown seconds,
+    then a single trial call is let through (half-open): success closes it, failure opens it again.
+    A trial that never reports back (e.g. its caller died mid-request) is given up after another
+    cooldown, and a new trial is let through.
+    """
+    def __init__(self, threshold=5, cooldown=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_at = 0.0
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if (self.state == "open" and now - self.opened_at >= self.cooldown) or (self.state == "half-open" and now - self.trial_at >= self.cooldown):
+                self.state = "half-open"
+                self.trial_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def endpoint_key(method, endpoint):
+    """
+    Groups requests per endpoint for the circuit breaker, e.g. "PATCH hunch_club/tips/{id}".
+    """
+    path = "/".join("{id}" if re.fullmatch(r"[0-9a-fA-F]{24}|\d+|[0-9a-fA-F-]{36}", part) else part for part in endpoint.strip("/").split("/"))
+    return f"{method} {path}"
+
+
+def get_breaker(key):
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN)
+        return _breakers[key]
+
+
+def retry_delay(attempt, response=None):
+    """
+    Seconds to wait before retry number attempt + 1: the server's Retry-After if it sent one,
+    otherwise exponential backoff with full jitter. Both are capped at HTTP_BACKOFF_MAX.
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+        except ValueError:
+            try:
+                return min(max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()), HTTP_BACKOFF_MAX)
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+
+def record_request(key, start, status, response=None, streamed=False):
+    """
+    Records one attempt's latency, status and response size for the endpoint key.
+    Streamed responses have no body read yet, so only their Content-Length is counted.
+    """
+    metrics.observe("http_request_duration_seconds", time.perf_counter() - start, help="API call latency, per attempt", endpoint=key)
+    metrics.inc("http_requests_total", help="API calls by status", endpoint=key, status=status)
+    if response is not None:
+        size = response.headers.get("Content-Length")
+        if size is None and not streamed:
+            size = len(response.content)
+        if size is not None:
+            metrics.observe("http_response_bytes", int(size), buckets=SIZE_BUCKETS, help="API response body size", endpoint=key)
+
+
+def send(method, url, endpoint, idempotency_key=None, max_retries=None, **kwargs):
+    """
+    Sends a request with the retry and circuit-breaker policy.
+    Retries connection failures, timeouts, other request errors (e.g. a body cut off mid-transfer)
+    and 429/502/503/504 responses for idempotent methods,
+    or any method sent with an idempotency_key (passed as the Idempotency-Key header).
+    A connect timeout is always retried, since the request never reached the server.
+    Raises CircuitOpenError when the endpoint's circuit is open, or the last error once retries run out.
+    """
+    if max_retries is None: max_retries = HTTP_MAX_RETRIES
+    if idempotency_key:
+        kwargs['headers'] = {**(kwargs.get('headers') or {}), "Idempotency-Key": idempotency_key}
+    key = endpoint_key(method, endpoint)
+    breaker = get_breaker(key)
+    retryable = method in IDEMPOTENT_METHODS or bool(idempotency_key)
+    
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            metrics.inc("http_requests_total", endpoint=key, status="circuit_open")
+            raise CircuitOpenError(f"API degraded, not calling {key} (circuit open)")
+        start = time.perf_counter()
+        try:
+            res = get_session().request(method, url, **kwargs)
+        except requests.RequestException as e:
+            if isinstance(e, requests.Timeout): status = "timeout"
+            elif isinstance(e, requests.ConnectionError): status = "connection_error"
+            else: status = "request_error"
+            record_request(key, start, status)
+            breaker.record_failure()
+            if attempt >= max_retries or not (retryable or isinstance(e, requests.ConnectTimeout)):
+                raise
+            delay = retry_delay(attempt)
+        else:
+            record_request(key, start, res.status_code, res, streamed=kwargs.get("stream", False))
+            if res.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if attempt >= max_retries or not retryable or res.status_code not in RETRY_STATUSES:
+                return res
+            delay = retry_delay(attempt, res)
+            # Hand the connection back to the pool now; a streamed body would otherwise hold it until GC
+            res.close()
+        log.warning(f"{key} failed, retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        attempt += 1
+        time.sleep(delay)
+
+
+# Characters that can continue a JSON number
+NUMBER_CHARS = "0123456789+-.eE"
+
+
+class JSONStream:
+    """
+    Reads JSON values one at a time from a stream of UTF-8 byte chunks, keeping only the
+    text not parsed yet. Used by iter_json_array.
+    """
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Appends the next chunk, dropping the text already parsed. Returns False once the stream is exhausted.
+        """
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        self.eof = chunk is None
+        self.buf = self.buf[self.pos:] + self.utf8.decode(chunk or b"", final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character, "" at the end of the stream.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\n\r":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def take(self, chars):
+        """
+        Consumes the next character, which must be one of chars, and returns it.
+        """
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed JSON stream: expected one of {chars!r}, got {char or 'end of stream'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Parses the next JSON value, reading more chunks until it is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill(): continue
+                raise
+            # A number is only complete once something that can't continue it follows: "-0." or "1.5e"
+            # at the end of the buffer decodes as -0 or 1.5, and the rest is in the next chunk
+            if isinstance(value, (int, float)) and not self.buf[end:end + 1].strip(NUMBER_CHARS) and self.fill(): continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks, key="data"):
+    """
+    Yields the items of the array at key of a streamed JSON object as they arrive, e.g. from
+    response.iter_content() on a request sent with stream=True (gzip/br are already decoded there).
+    Memory stays at about one chunk plus one item. Other keys are parsed and dropped.
+    Raises ValueError on malformed or truncated JSON.
+    """
+    stream = JSONStream(chunks)
+    stream.take("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        name = stream.value()
+        stream.take(":")
+        if name == key:
+            stream.take("[")
+            if stream.peek() == "]":
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.take(",]") == "]": break
+        else:
+            stream.value()
+        if stream.take(",}") == "}":
+            return
@@ -0,0 +1,124 @@
+import time
+import random
+import threading
+from loguru import logger as log
+
+from core.vars import SERVER_ADDRESS, HEALTH_CHECK_INTERVAL, HEALTH_MAX_BACKOFF, HEALTH_FAILURE_THRESHOLD
+from core.client import get_session
+
+
+class HealthMonitor:
+    """
+    Pings common/ping from a background thread and keeps the latest liveness/latency state,
+    so pages can read it instantly instead of blocking on a request.
+
+    While the server is up it is checked every interval seconds. After a failure checks back off
+    exponentially (with jitter) up to max_backoff. Once failure_threshold checks in a row have
+    failed the circuit opens: the server is reported offline until a check succeeds again.
+    """
+    def __init__(self, interval=15, max_backoff=300, failure_threshold=2, timeout=(2, 5)):
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.thread = None
+        self.state = {
+            "online": None,         # None until the first check
+            "circuit": "closed",    # "closed", "open" or "half-open" (checking again after being open)
+            "latency_ms": None,
+            "payload": None,        # Last ping response body
+            "error": None,
+            "failures": 0,
+            "last_check": None,
+            "last_ok": None,
+            "next_check": None,
+        }
+
+    def check(self):
+        """
+        Pings the server once and updates the state.
+        """
+        with self.lock:
+            if self.state["circuit"] == "open":
+                self.state["circuit"] = "half-open"
+        start = time.monotonic()
+        try:
+            res = get_session().get(SERVER_ADDRESS + "/common/ping", timeout=self.timeout)
+            if res.status_code != 200:
+                raise Exception(f"Server not available at {SERVER_ADDRESS} ({res.status_code})")
+            try:
+                payload = res.json()
+            except ValueError:
+                payload = None
+            with self.lock:
+                self.state.update({
+                    "online": True,
+                    "circuit": "closed",
+                    "latency_ms": round((time.monotonic() - start) * 1000, 1),
+                    "payload": payload if isinstance(payload, dict) else {},
+                    "error": None,
+                    "failures": 0,
+                    "last_check": time.time(),
+                    "last_ok": time.time(),
+                })
+        except Exception as e:
+            with self.lock:
+                failures = self.state["failures"] + 1
+                if self.state["online"] is not False:
+                    log.error(e)
+                self.state.update({
+                    "online": False if failures >= self.failure_threshold or not self.state["last_ok"] else self.state["online"],
+                    "circuit": "open" if failures >= self.failure_threshold else self.state["circuit"],
+                    "error": str(e),
+                    "failures": failures,
+                    "last_check": time.time(),
+                })
+        with self.lock:
+            self.state["next_check"] = time.time() + self.delay()
+
+    def delay(self):
+        """
+        Seconds until the next check: the interval while healthy, exponential backoff with jitter after failures.
+        """
+        failures = self.state["failures"]
+        if not failures:
+            return self.interval
+        backoff = min(self.interval * 2 ** (failures - 1), self.max_backoff)
+        return backoff * random.uniform(0.8, 1.2)
+
+    def run(self):
+        while True:
+            time.sleep(max(0, (self.state["next_check"] or 0) - time.time()))
+            self.check()
+
+    def start(self):
+        """
+        Runs the first check inline (so the first page knows the state), then keeps checking in the background.
+        """
+        self.check()
+        self.thread = threading.Thread(target=self.run, name="health-monitor", daemon=True)
+        self.thread.start()
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.state)
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_health_monitor():
+    """
+    Returns the process-wide health monitor, starting it on first use.
+    Sessions arriving while the first check runs wait for it rather than seeing an unknown state.
+    """
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                monitor = HealthMonitor(HEALTH_CHECK_INTERVAL, HEALTH_MAX_BACKOFF, HEALTH_FAILURE_THRESHOLD)
+                monitor.start()
+                _monitor = monitor
+    return _monitor
@@ -0,0 +1,161 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from loguru import logger as log
+
+PREFIX = "hunchclub_admin"
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+SIZE_BUCKETS = [1e3, 1e4, 1e5, 1e6, 1e7, 1e8]
+
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram, with quantiles estimated from the buckets.
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """
+    Process-wide counters and histograms, keyed by (metric name, labels).
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.help = {}
+
+    @staticmethod
+    def key(name, labels):
+        # Label values are kept as strings, so series with e.g. status=200 and status="timeout" still sort
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, help=None, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+            if help: self.help[name] = help
+
+    def inc(self, name, value=1, help=None, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            if help: self.help[name] = help
+
+    @contextmanager
+    def timer(self, name, help=None, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, help=help, **labels)
+
+    def snapshot(self):
+        """
+        Returns copies of the counters and histograms, for the Diagnostics page.
+        """
+        with self.lock:
+            histograms = {}
+            for key, hist in self.histograms.items():
+                copy = Histogram(hist.buckets)
+                copy.counts, copy.sum, copy.count = list(hist.counts), hist.sum, hist.count
+                histograms[key] = copy
+            return dict(self.counters), histograms
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        counters, histograms = self.snapshot()
+        lines = []
+        seen = set()
+
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        def _labels(labels, extra=()):
+            pairs = [*labels, *extra]
+            return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+        for (name, labels), value in sorted(counters.items()):
+            if name not in seen:
+                seen.add(name)
+                if name in self.help: lines.append(f"# HELP {PREFIX}_{name} {self.help[name]}")
+                lines.append(f"# TYPE {PREFIX}_{name} counter")
+            lines.append(f"{PREFIX}_{name}{_labels(labels)} {value}")
+        for (name, labels), hist in sorted(histograms.items()):
+            if name not in seen:
+                seen.add(name)
+                if name in self.help: lines.append(f"# HELP {PREFIX}_{name} {self.help[name]}")
+                lines.append(f"# TYPE {PREFIX}_{name} histogram")
+            cumulative = 0
+            for bound, count in zip([*hist.buckets, "+Inf"], hist.counts):
+                cumulative += count
+                lines.append(f"{PREFIX}_{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{PREFIX}_{name}_sum{_labels(labels)} {hist.sum}")
+            lines.append(f"{PREFIX}_{name}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = metrics.render().encode()
+        self.send_response(200 if self.path.rstrip("/") in ["", "/metrics"] else 404)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port):
+    """
+    Serves /metrics for Prometheus on port from a background thread. Started once per process.
+    """
+    global _server
+    with _server_lock:
+        if _server or not port:
+            return
+        try:
+            _server = ThreadingHTTPServer(("0.0.0.0", int(port)), MetricsHandler)
+        except OSError as e:
+            log.error(f"Metrics server not started on port {port}: {e}")
+            _server = False
+            return
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        log.info(f"Metrics available on :{port}/metrics")
@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import Counter, deque
+import streamlit as st
+
+from core.vars import PROFILE_KEEP, PROFILE_INTERVAL
+
+# Last PROFILE_KEEP page runs profiled on this replica, newest last
+profiles = deque(maxlen=PROFILE_KEEP)
+_active = {}
+_lock = threading.Lock()
+
+
+class Sampler(threading.Thread):
+    """
+    Samples the call stack of one thread every interval seconds until stopped.
+    Stacks are kept as tuples of (function, file, line) frames, outermost first, starting at the page script.
+    """
+    def __init__(self, thread_id, page, interval=0.005, max_duration=120):
+        super().__init__(name="profiler", daemon=True)
+        self.thread_id = thread_id
+        self.page = page
+        self.interval = interval
+        self.max_duration = max_duration
+        self.samples = Counter()
+        self.stopped = threading.Event()
+        self.started = time.time()
+        self.start_counter = time.perf_counter()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or time.perf_counter() - self.start_counter > self.max_duration:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            # Drop Streamlit's script runner frames above the page itself
+            for i, (_, filename, _) in enumerate(stack):
+                if filename == self.page:
+                    stack = stack[i:]
+                    break
+            self.samples[tuple(stack)] += 1
+
+    def stop(self, complete=True):
+        self.stopped.set()
+        self.join()
+        return {
+            "page": os.path.basename(self.page),
+            "started": self.started,
+            "duration": time.perf_counter() - self.start_counter,
+            "interval": self.interval,
+            "samples": self.samples,
+            "complete": complete,
+        }
+
+
+def start_profile(page):
+    """
+    Starts profiling the current script run. A run still being profiled on this thread
+    (cut short by st.stop() or st.rerun()) is kept as an incomplete profile.
+        page: str = Path of the page script, used to trim the stacks.
+    """
+    thread_id = threading.get_ident()
+    stop_profile(complete=False)
+    sampler = Sampler(thread_id, page, PROFILE_INTERVAL)
+    with _lock:
+        _active[thread_id] = sampler
+    sampler.start()
+
+
+def stop_profile(complete=True):
+    """
+    Stops profiling the current script run and keeps the profile.
+    """
+    with _lock:
+        sampler = _active.pop(threading.get_ident(), None)
+    if sampler:
+        profile = sampler.stop(complete)
+        if profile['samples']:
+            profiles.append(profile)
+
+
+def label(frame):
+    name, filename, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def hot_functions(profile, limit=20):
+    """
+    Returns the functions seen in most samples: self (the function itself was running)
+    and total (it was anywhere on the stack), as rows sorted by self time.
+    """
+    own, total = Counter(), Counter()
+    for stack, count in profile['samples'].items():
+        own[stack[-1]] += count
+        for frame in set(stack):
+            total[frame] += count
+    samples = sum(profile['samples'].values())
+    rows = [{
+        "function": label(frame),
+        "self_ms": round(own[frame] * profile['interval'] * 1000, 1),
+        "self_%": round(100 * own[frame] / samples, 1),
+        "total_ms": round(total[frame] * profile['interval'] * 1000, 1),
+        "total_%": round(100 * total[frame] / samples, 1),
+    } for frame in total]
+    return sorted(rows, key=lambda r: (r['self_%'], r['total_%']), reverse=True)[:limit]
+
+
+def to_collapsed(profile):
+    """
+    Returns the profile as collapsed stacks ("a;b;c count" per line), for flamegraph.pl or speedscope.
+    """
+    return "\n".join(f"{';'.join(label(frame) for frame in stack)} {count}" for stack, count in profile['samples'].items()) + "\n"
+
+
+def to_speedscope(profile):
+    """
+    Returns the profile in speedscope's JSON format (https://www.speedscope.app).
+    """
+    frames, index = [], {}
+    samples, weights = [], []
+    for stack, count in profile['samples'].items():
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+        samples.append([index[frame] for frame in stack])
+        weights.append(round(count * profile['interval'] * 1000, 3))
+    return json.dumps({
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": profile['page'],
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": profile['page'],
+        "exporter": "hunchclub-admin",
+    })
+
+
+def show_profiles():
+    """
+    Shows the kept profiles' hot functions, with collapsed-stack and speedscope downloads.
+    """
+    st.subheader("Profiles")
+    if not profiles:
+        st.caption("No profiled runs yet. Profiles appear from the next rerun.")
+        return
+    kept = list(reversed(profiles))
+    names = [f"{p['page']} · {time.strftime('%H:%M:%S', time.localtime(p['started']))} · {p['duration'] * 1000:.0f} ms{'' if p['complete'] else ' (interrupted)'}" for p in kept]
+    selected = st.selectbox("Run", range(len(kept)), format_func=lambda i: names[i], key="_profile_selected")
+    profile = kept[selected or 0]
+    st.dataframe(hot_functions(profile), hide_index=True, use_container_width=True)
+    c1, c2 = st.columns(2)
+    _name = f"{profile['page'].removesuffix('.py')}-{int(profile['started'])}"
+    c1.download_button("Collapsed stacks", to_collapsed(profile), file_name=f"{_name}.collapsed.txt", mime="text/plain", use_container_width=True)
+    c2.download_button("Speedscope", to_speedscope(profile), file_name=f"{_name}.speedscope.json", mime="application/json", use_container_width=True)
@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import threading
+import pyarrow as pa
+from loguru import logger as log
+
+from core.vars import SNAPSHOT_DIR
+
+# Bumped when the layout of snapshot files changes, older files are then ignored
+SNAPSHOT_FORMAT = 1
+
+_lock = threading.Lock()
+
+
+def snapshot_path(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.arrow")
+
+
+def save_snapshot(name, table:pa.Table, **meta):
+    """
+    Writes table to SNAPSHOT_DIR/<name>.arrow as an Arrow IPC file, with meta (JSON) in its schema metadata.
+    The file is written next to the old one and swapped in, so readers never see a partial snapshot.
+    Returns False (and logs) on failure; a missing snapshot only costs a slower start.
+    """
+    if not SNAPSHOT_DIR:
+        return False
+    path = snapshot_path(name)
+    meta = {**meta, "format": SNAPSHOT_FORMAT, "saved_at": time.time()}
+    table = table.replace_schema_metadata({"snapshot": json.dumps(meta)})
+    try:
+        with _lock:
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            # Snapshots can hold credentials, keep them readable by this user only
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, path)
+        return True
+    except Exception as e:
+        log.error(f"Could not save snapshot {name}: {e}")
+        return False
+
+
+def load_snapshot(name):
+    """
+    Opens SNAPSHOT_DIR/<name>.arrow memory-mapped, so only the record batches read are paged in.
+    Returns (reader, meta), or (None, None) if there is no usable snapshot.
+    """
+    if not SNAPSHOT_DIR:
+        return None, None
+    path = snapshot_path(name)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        meta = json.loads((reader.schema.metadata or {}).get(b"snapshot", b"{}"))
+        if meta.get("format") != SNAPSHOT_FORMAT:
+            log.info(f"Ignoring snapshot {name}: format {meta.get('format')}, expected {SNAPSHOT_FORMAT}")
+            return None, None
+        return reader, meta
+    except Exception as e:
+        log.error(f"Could not load snapshot {name}: {e}")
+        return None, None
+
+
+def save_value(name, value, **meta):
+    """
+    Saves a JSON-serializable value as a one-row snapshot.
+    """
+    return save_snapshot(name, pa.table({"value": [json.dumps(value)]}), **meta)
+
+
+def load_value(name):
+    """
+    Returns (value, meta) saved with save_value, or (None, None).
+    """
+    reader, meta = load_snapshot(name)
+    if reader is None:
+        return None, None
+    try:
+        return json.loads(reader.read_all().column("value")[0].as_py()), meta
+    except Exception as e:
+        log.error(f"Could not read snapshot {name}: {e}")
+        return None, None
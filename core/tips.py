@@ -0,0 +1,399 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+import pyarrow as pa
+from loguru import logger as log
+
+from core.utils import server_request
+from core.client import iter_json_array
+from core.vars import TIPS_STREAM, TIPS_WIRE_FORMAT
+from core.snapshot import save_snapshot, load_snapshot
+from core.metrics import metrics
+from schema.hunch_club import TipSchema, decode_tips, decode_tip_batch
+
+TIP_COLUMNS = list(TipSchema.model_fields)
+# Streaming sync: raw tips validated at once (bounds the raw dicts held next to the decoded tips), bytes read at once
+STREAM_BATCH_SIZE = 1000
+STREAM_CHUNK_SIZE = 64 * 1024
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+# Day buckets shown on the Tips page, newest first: (first, last) day relative to today, None is open ended
+TIP_BUCKETS = {"future": (2, None), "tomorrow": (1, 1), "today": (0, 0), "yesterday": (-1, -1)}
+
+
+def utc_day(value):
+    """
+    Returns the UTC calendar day of a tip datetime. Naive datetimes are taken as UTC.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def to_frame(tips):
+    """
+    Returns tip dicts as a DataFrame with a typed datetime column, sorted newest first.
+    """
+    frame = pd.DataFrame(tips, columns=TIP_COLUMNS)
+    frame['datetime'] = pd.to_datetime(frame['datetime'])
+    return frame.sort_values('datetime', ascending=False, kind='stable', ignore_index=True)
+
+
+class TipCache:
+    """
+    Tips keyed by id, kept in sync with hunch_club/tips/all incrementally.
+
+    A sync only asks for tips changed since the high-water mark (the newest `updated_at` seen),
+    via hunch_club/tips/all?updated_since=<iso>, and upserts them. Local writes are applied
+    optimistically with apply_local(), so a save does not need a reload. A full fetch still runs
+    every reconcile_interval seconds (or after invalidate()) to pick up deletions and anything missed.
+    Servers that do not send `updated_at` have no delta to ask for, so they only get the full fetch, every reconcile_interval.
+
+    Tip ids are also indexed by UTC day. The index is rebuilt on a full reconcile and moved tip by tip
+    on delta syncs and local writes, so day buckets and date range queries only read the days they need.
+
+    Delta syncs only count tips that differ from the cached ones, so an idle sync leaves the version
+    (and everything built from it) alone.
+
+    With a snapshot name, the tips are also saved to disk (core.snapshot) after each sync that changed them.
+    A fresh process starts from that snapshot and revalidates in the background, instead of downloading everything first.
+    """
+    def __init__(self, sync_interval=30, reconcile_interval=3600, snapshot=None):
+        self.sync_interval = sync_interval
+        self.reconcile_interval = reconcile_interval
+        self.snapshot = snapshot
+        self.snapshot_checked = False
+        self.save_lock = threading.Lock()
+        self.saved_version = 0
+        self.reconciled_at = None
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.tips = {}
+        self.high_water = None
+        self.last_sync = 0.0
+        self.last_reconcile = 0.0
+        self.version = 0
+        self.errors = []
+        self.last_error = None
+        self.refreshing = False
+        self._frame = None
+        self._frame_version = -1
+        self._event_types = None
+        self._event_types_version = -1
+        self.days = {}
+        self._buckets = None
+        self._buckets_key = None
+
+    def due(self):
+        """
+        Returns (sync due, full reconcile due).
+        """
+        now = time.monotonic()
+        reconcile_due = not self.last_reconcile or now - self.last_reconcile >= self.reconcile_interval
+        if self.high_water is None:
+            # No high-water mark, so any sync would be a full download: only run it on the reconcile schedule
+            return reconcile_due, reconcile_due
+        return reconcile_due or now - self.last_sync >= self.sync_interval, reconcile_due
+
+    def sync(self, force=False):
+        """
+        Brings the cache up to date if a delta sync or full reconcile is due.
+        Only one sync runs at a time; readers keep using the current contents meanwhile.
+        Raises on API errors, leaving the current contents untouched.
+        """
+        with self.sync_lock:
+            sync_due, full = self.due()
+            full = full or force
+            if not (sync_due or full):
+                return False
+            now = time.monotonic()
+
+            params = None if full else {"updated_since": self.high_water}
+            # Servers that cannot send Arrow answer with JSON, told apart by the Content-Type
+            headers = {"Accept": f"{ARROW_STREAM_TYPE}, application/json;q=0.9"} if TIPS_WIRE_FORMAT == "arrow" else None
+            res = server_request("hunch_club/tips/all", params=params, headers=headers, stream=TIPS_STREAM)
+            if res is None:
+                raise Exception("No response from server")
+            with res:
+                if res.status_code != 200:
+                    raise Exception(f"Error fetching data: {res.status_code} {res.text}")
+                if res.headers.get("Content-Type", "").startswith(ARROW_STREAM_TYPE):
+                    with metrics.timer("decode_duration_seconds", help="JSON parsing and validation time", stage="tips_arrow"):
+                        if TIPS_STREAM: res.raw.decode_content = True
+                        decoded, errors, received, high_water = read_arrow_tips(pa.ipc.open_stream(res.raw if TIPS_STREAM else res.content))
+                elif TIPS_STREAM:
+                    with metrics.timer("decode_duration_seconds", help="JSON parsing and validation time", stage="tips_stream"):
+                        decoded, errors, received, high_water = read_tips(iter_json_array(res.iter_content(STREAM_CHUNK_SIZE)))
+                else:
+                    with metrics.timer("decode_duration_seconds", help="JSON parsing and validation time", stage="tips_json"):
+                        data = res.json().get('data', [])
+                    with metrics.timer("decode_duration_seconds", stage="tips_validate"):
+                        decoded, errors, received, high_water = read_tips(data, batch_size=None)
+                    del data
+
+            # Newest updated_at seen, carried over from the previous mark on a delta sync
+            if not full:
+                high_water = max(filter(None, [high_water, self.high_water]), default=None)
+            
+            for index, error in errors:
+                log.warning(f"Skipped malformed tip at row {index}: {error}")
+
+            with self.lock:
+                if not full:
+                    # updated_since is inclusive on some servers, so the tips at the high-water mark come back
+                    # every time: only upsert tips that actually changed
+                    decoded = [tip for tip in decoded if self.tips.get(tip['id']) != tip]
+                changed = full or bool(decoded)
+                tips = {} if full else dict(self.tips)
+                tips.update((tip['id'], tip) for tip in decoded)
+                if full:
+                    self.days = {}
+                    self._index(tips.values(), {})
+                    self.last_reconcile = now
+                    self.reconciled_at = time.time()
+                else:
+                    self._index(decoded, self.tips)
+                self.tips = tips
+                self.high_water = high_water
+                self.last_sync = now
+                self.errors = errors
+                self.last_error = None
+                if changed:
+                    self.version += 1
+            if self.snapshot and changed:
+                threading.Thread(target=self.save_snapshot, name="tips-snapshot", daemon=True).start()
+            metrics.inc("tip_syncs_total", help="Tip cache syncs", kind="full" if full else "delta")
+            log.info(f"Tips {'reconciled' if full else 'synced'}: {received} received, {len(decoded)} changed, {len(tips)} cached")
+            return True
+
+    def refresh(self):
+        """
+        Stale-while-revalidate: syncs inline only when nothing is cached yet (or after invalidate()),
+        otherwise starts one background sync and returns straight away with the current contents.
+        Background errors are kept in last_error.
+        """
+        if not self.last_reconcile and not self.load_snapshot():
+            return self.sync()
+        if self.due()[0]:
+            with self.lock:
+                start = not self.refreshing
+                self.refreshing = True
+            if start:
+                threading.Thread(target=self._background_sync, daemon=True).start()
+        return False
+
+    def _background_sync(self):
+        try:
+            self.sync()
+        except Exception as e:
+            log.error(e)
+            self.last_error = str(e)
+        finally:
+            self.refreshing = False
+
+    def save_snapshot(self):
+        """
+        Writes the cached tips, version and high-water mark to the on-disk snapshot.
+        Runs after syncs in its own thread; a save that is already out of date is skipped.
+        """
+        with self.save_lock:
+            with self.lock:
+                tips, version, high_water, reconciled_at = self.tips, self.version, self.high_water, self.reconciled_at
+            if version <= self.saved_version or not tips:
+                return
+            try:
+                table = pa.Table.from_pylist(list(tips.values()))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                log.error(f"Could not snapshot tips: {e}")
+                return
+            if save_snapshot(self.snapshot, table, version=version, high_water=high_water, reconciled_at=reconciled_at, columns=TIP_COLUMNS):
+                self.saved_version = version
+
+    def load_snapshot(self):
+        """
+        Fills the empty cache from the on-disk snapshot, once per process. Its high-water mark makes the
+        next sync a delta, and its reconcile time keeps the full reconcile on schedule.
+        Returns True if the cache has contents (from the snapshot, or a sync that got there first).
+        """
+        with self.sync_lock:
+            if self.last_reconcile:
+                return True
+            if self.snapshot_checked or not self.snapshot:
+                return False
+            self.snapshot_checked = True
+            reader, meta = load_snapshot(self.snapshot)
+            if reader is None or meta.get("columns") != TIP_COLUMNS:
+                return False
+            with metrics.timer("decode_duration_seconds", stage="tips_snapshot"):
+                decoded, _, _, _ = read_arrow_tips(reader.get_batch(i) for i in range(reader.num_record_batches))
+            age = time.time() - (meta.get("reconciled_at") or 0)
+            with self.lock:
+                self.tips = {tip['id']: tip for tip in decoded}
+                self.days = {}
+                self._index(self.tips.values(), {})
+                self.high_water = meta.get("high_water")
+                self.reconciled_at = meta.get("reconciled_at")
+                # Reconcile when it would have been due had this process done the last one. Without a
+                # high-water mark there is no delta to revalidate with, so reconcile once in the background.
+                self.last_reconcile = time.monotonic() - (age if self.high_water else self.reconcile_interval)
+                self.last_sync = 0.0
+                self.version += 1
+            self.saved_version = self.version
+            log.info(f"Tips loaded from snapshot: {len(decoded)} tips, saved at {time.ctime(meta['saved_at'])}")
+            return True
+
+    def apply_local(self, updates:dict):
+        """
+        Applies successful writes, {tip_id: changes}, to the cached tips without refetching.
+        Tip dicts are replaced rather than mutated, so lists already handed out stay consistent.
+        """
+        with self.lock:
+            tips = dict(self.tips)
+            for id, changes in updates.items():
+                if id in tips:
+                    tips[id] = {**tips[id], **changes}
+            if any('datetime' in changes for changes in updates.values()):
+                self._index([tips[id] for id in updates if id in tips], self.tips)
+            self.tips = tips
+            self.version += 1
+
+    def invalidate(self):
+        """
+        Forces a full reconcile on the next sync.
+        """
+        with self.lock:
+            self.last_reconcile = 0.0
+
+    def all(self):
+        """
+        Returns the cached tips as a list.
+        """
+        return list(self.tips.values())
+
+    def frame(self):
+        """
+        Returns the cached tips as a DataFrame with a typed datetime column, sorted newest first.
+        Built once per change to the cache and shared by every rerun and session, so treat it as read-only.
+        """
+        with self.lock:
+            if self._frame_version != self.version:
+                self._frame = to_frame(list(self.tips.values()))
+                self._frame_version = self.version
+            return self._frame
+
+    def event_types(self):
+        """
+        Returns the sorted event types of the cached tips, worked out once per change to the cache.
+        """
+        with self.lock:
+            if self._event_types_version != self.version:
+                self._event_types = sorted({tip['event_type'] for tip in self.tips.values() if tip.get('event_type')})
+                self._event_types_version = self.version
+            return self._event_types
+
+    def _index(self, tips, previous:dict):
+        """
+        Files tips under their UTC day, moving them off the day they had in previous. Call with self.lock held.
+        """
+        for tip in tips:
+            old = previous.get(tip['id'])
+            if old is not None:
+                day = utc_day(old['datetime'])
+                ids = self.days.get(day)
+                if ids is not None:
+                    ids.discard(tip['id'])
+                    if not ids: del self.days[day]
+            self.days.setdefault(utc_day(tip['datetime']), set()).add(tip['id'])
+
+    def between(self, first, last=None):
+        """
+        Returns the tips dated on UTC days first to last (inclusive, open ended if None), newest first.
+        Only the tips on those days are read, e.g. the last 30 days settled:
+            [tip for tip in cache.between(today - timedelta(days=30), today) if tip['bet_result']]
+        first: date = First UTC day, None for no lower bound.
+        last: date = Last UTC day, None for no upper bound.
+        """
+        with self.lock:
+            tips = [self.tips[id] for day, ids in self.days.items()
+                    if (first is None or day >= first) and (last is None or day <= last) for id in ids]
+        return sorted(tips, key=lambda tip: tip['datetime'], reverse=True)
+
+    def buckets(self, now=None):
+        """
+        Returns {bucket: DataFrame} for each of TIP_BUCKETS, newest first, read from the day index.
+        Kept until the cache changes or the UTC day rolls over, so "today" moves forward at midnight by itself.
+        Shared by every rerun and session, so treat the frames as read-only.
+        """
+        today = utc_day(now or datetime.now(timezone.utc))
+        with self.lock:
+            if self._buckets_key == (self.version, today):
+                return self._buckets
+            version = self.version
+        buckets = {}
+        for bucket, (first, last) in TIP_BUCKETS.items():
+            buckets[bucket] = to_frame(self.between(today + timedelta(days=first), today + timedelta(days=last) if last is not None else None))
+        with self.lock:
+            if self.version == version:
+                self._buckets, self._buckets_key = buckets, (version, today)
+        return buckets
+
+
+def read_tips(items, batch_size=STREAM_BATCH_SIZE):
+    """
+    Validates raw API tips as they come, batch_size at a time (all at once if None), so only one
+    batch of raw dicts is held next to the decoded tips.
+    Returns (tips, errors, number received, newest updated_at) where errors is a list of (row index, message).
+    """
+    tips, errors, batch = [], [], []
+    received, high_water = 0, None
+
+    def flush():
+        decoded, batch_errors = decode_tips(batch)
+        tips.extend(decoded)
+        errors.extend((received - len(batch) + index, error) for index, error in batch_errors)
+        batch.clear()
+
+    for item in items:
+        received += 1
+        if isinstance(item, dict) and item.get('updated_at'):
+            high_water = max(high_water or item['updated_at'], item['updated_at'])
+        batch.append(item)
+        if batch_size and len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return tips, errors, received, high_water
+
+
+def read_arrow_tips(batches):
+    """
+    Reads tips from Arrow record batches (e.g. an IPC stream reader) one batch at a time.
+    Returns (tips, errors, number received, newest updated_at) like read_tips.
+    """
+    tips, errors = [], []
+    received, high_water = 0, None
+    for batch in batches:
+        decoded, batch_errors = decode_tip_batch(batch)
+        tips.extend(decoded)
+        errors.extend((received + index, error) for index, error in batch_errors)
+        received += batch.num_rows
+        if "updated_at" in batch.schema.names:
+            high_water = max(filter(None, [high_water, *batch.column("updated_at").cast(pa.string()).to_pylist()]), default=None)
+    return tips, errors, received, high_water
+
+
+def page_tips(frame, page=1, page_size=50, date_from=None, date_to=None, event_type=None):
+    """
+    Returns one page of a newest-first tips frame, and the number of matching tips.
+        date_from: datetime = Only tips at or after this time.
+        date_to: datetime = Only tips before this time.
+        event_type: str = Only tips of this event type.
+    """
+    ascending = frame['datetime'].values[::-1]
+    start = len(frame) - ascending.searchsorted(pd.Timestamp(date_to).to_datetime64(), side='left') if date_to else 0
+    end = len(frame) - ascending.searchsorted(pd.Timestamp(date_from).to_datetime64(), side='left') if date_from else len(frame)
+    frame = frame.iloc[start:max(start, end)]
+    if event_type:
+        frame = frame[frame['event_type'] == event_type]
+    offset = (max(page, 1) - 1) * page_size
+    return frame.iloc[offset:offset + page_size], len(frame)
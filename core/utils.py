@@ -2,14 +2,24 @@ import streamlit as st
 # from rich import print
 import datetime
 import os
-import requests
-from time import sleep
+import sys
+from time import sleep, time, perf_counter
 from loguru import logger as log
 from importlib import import_module
-import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import hashlib
+import threading
+from dataclasses import dataclass, replace
+from typing import Optional
 
 # Custom imports
-from core.vars import SERVER_ADDRESS, DEBUG, API_TOKEN
+from core.vars import SERVER_ADDRESS, DEBUG, API_TOKEN, BULK_MAX_WORKERS, METRICS_PORT, PROFILE
+from core.client import send, DEFAULT_TIMEOUT
+from core.cache import cached
+from core.health import get_health_monitor
+from core.metrics import metrics, start_metrics_server
+from core.profiler import start_profile, stop_profile, show_profiles
 from config.menu import sidebar_menu
 
 
@@ -17,19 +27,23 @@ def to_snake_case(snake_case_string:str):
     words = snake_case_string.split('_')
     return ' '.join(word.capitalize() for word in words)
 
-@st.cache_resource(ttl=60)
 def ping_server():
-    try:
-        response = requests.get(SERVER_ADDRESS + "/common/ping")
-        if response.status_code != 200:
-            raise Exception("Server not available at " + SERVER_ADDRESS)
-        return True
-    except Exception as e:
-        log.error(e)
-    return False
+    """
+    Health probe. Returns the last ping payload (a dict, possibly empty) if the server is up, None otherwise.
+    Reads the background health monitor's state, so it never blocks on the network.
+    """
+    health = get_health_monitor().snapshot()
+    return health['payload'] if health['online'] else None
 
 def init():
     
+    # Timed (and profiled, if PROFILE is set) until footer(), for the Diagnostics page
+    _page = sys._getframe(1).f_code.co_filename
+    st.session_state['_run_started'] = (os.path.basename(_page), perf_counter())
+    start_metrics_server(METRICS_PORT)
+    if PROFILE:
+        start_profile(_page)
+    
     # Force remove default page navigation
     st.config.set_option('client.showSidebarNavigation', False)
     
@@ -46,15 +60,23 @@ def init():
         # print("Failed to set page config")
         pass
         
-    if not ping_server():
-        st.error("Server is Offline at " + SERVER_ADDRESS, icon="🚨")
-        ping_server.clear()
+    health = get_health_monitor().snapshot()
+    if not health['online']:
+        _retry = max(0, int((health['next_check'] or time()) - time()))
+        st.error(f"Server is Offline at {SERVER_ADDRESS}. Retrying in {_retry}s...", icon="🚨")
+        if health['error']: st.caption(health['error'])
+        if st.button("Retry now"):
+            get_health_monitor().check()
+            st.rerun()
         st.stop()
     
-    if DEBUG:
+    if DEBUG or PROFILE:
         with st.expander("Debug"):
-            st.subheader("Session State")
-            st.write(st.session_state)
+            if DEBUG:
+                st.subheader("Session State")
+                st.write(st.session_state)
+            if PROFILE:
+                show_profiles()
 
     
     # If not authenticated, show login page
@@ -72,39 +94,91 @@ def init():
     st.sidebar.divider()
     st.sidebar.markdown(f'### {str(datetime.datetime.utcnow().strftime("%Y-%m-%d, %H:%M"))}')
     st.sidebar.markdown("`Environment: " + str(get_env()).upper() + "`")
+    if health['latency_ms'] is not None:
+        st.sidebar.markdown(f"`Latency: {health['latency_ms']} ms`")
     
+    show_flash()
     
-def footer():
+    
+def flash(message=None, kind="success"):
+    """
+    Queues a message to be shown on the next run, so results survive an st.rerun() without sleeping.
+        kind: str = Streamlit status element to use. Options: "success", "error", "warning", "info", "balloons"
+    """
+    st.session_state.setdefault('_flash', []).append((kind, message))
 
+def show_flash():
+    """
+    Shows and clears the messages queued with flash().
+    """
+    for kind, message in st.session_state.pop('_flash', []):
+        if kind == "balloons":
+            st.balloons()
+        else:
+            getattr(st, kind)(message)
 
-    if DEBUG:
-        with st.expander("Debug"):
-            st.subheader("Session State")
-            st.write(st.session_state)
+# Decorated functions rerun on their own when their widgets change (st.fragment, or st.experimental_fragment
+# before Streamlit 1.37). On older versions they are plain functions and every change reruns the page.
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+    
+    
+def footer():
+    """
+    Call at the end of a page. Records how long the run took since init(), per page, and ends its profile.
+    Runs cut short by st.stop() or st.rerun() are not timed.
+    """
+    if PROFILE:
+        stop_profile()
+    page, started = st.session_state.pop('_run_started', (None, None))
+    if started is not None:
+        metrics.observe("page_run_duration_seconds", perf_counter() - started, help="Script run time per page, from init() to footer()", page=page)
 
     
-@st.cache_resource(ttl=60 if not DEBUG else 5)
-def get_env():
+@cached(ttl=60 if not DEBUG else 5, stale_ttl=300)
+def get_dashboard():
     """
-    Returns dashboard metrics.
+    Returns dashboard metrics. One snapshot per TTL, shared by the sidebar and the dashboard page.
     """
     try:
         res = server_request("admin/dashboard")
+        if res is None:
+            raise Exception("No response from server")
         # print(res.status_code, res.text)
         if res.status_code == 200:
             data = res.json()
-            return data.get('data', [])['config']['environment']
+            return data.get('data', [])
         else:
             st.error(f"Error fetching data: {res.status_code} {res.text}")
         
     except Exception as e:
         log.error(e)
-        return "Unknown"
+        st.error(str(e))
         
-    return "Unknown"
+    return None
+
+
+def get_env():
+    """
+    Returns the server environment. Read from the health probe when the server reports it there
+    ({"environment": ...} or {"data": {"environment": ...}}), so most pages never need the
+    dashboard payload; otherwise from the shared dashboard snapshot.
+    """
+    probe = ping_server() or {}
+    data = probe['data'] if isinstance(probe.get('data'), dict) else {}
+    env = probe.get('environment') or data.get('environment')
+    if not env:
+        env = ((get_dashboard() or {}).get('config') or {}).get('environment')
+    return env or "Unknown"
         
         
-def server_request(endpoint, method="GET", data=None, headers=None, params=None, api_key=None):
+def server_request(endpoint, method="GET", data=None, headers=None, params=None, api_key=None, timeout=None, idempotency_key=None, stream=False):
+    """
+    Sends a request to the API server through the shared, pooled session, with retries and a
+    per-endpoint circuit breaker (see core.client.send). Returns None if no response was received.
+        timeout: tuple = (connect, read) timeout in seconds. Defaults to HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT.
+        idempotency_key: str = Lets a PATCH/POST be retried. Only pass one where a repeated write is harmless, the server does not dedupe on it.
+        stream: bool = Leave the body unread, to be consumed with res.iter_content(). Close the response when done.
+    """
     
     try:
         
@@ -112,22 +186,24 @@ def server_request(endpoint, method="GET", data=None, headers=None, params=None,
         
         if not api_key: api_key = API_TOKEN
         method = method.upper()
+        if method not in ["GET", "POST", "PUT", "DELETE", "PATCH"]:
+            raise Exception("Invalid method")
         
         headers = {
+            **(headers or {}),
             "Authorization": f"Bearer {api_key}"
         }
-        if method == "GET":
-            res = requests.get(f"{SERVER_ADDRESS}/{endpoint}", headers=headers)
-        elif method == "POST":
-            res = requests.post(f"{SERVER_ADDRESS}/{endpoint}", headers=headers, json=data)
-        elif method == "PUT":
-            res = requests.put(f"{SERVER_ADDRESS}/{endpoint}", headers=headers, json=data)
-        elif method == "DELETE":
-            res = requests.delete(f"{SERVER_ADDRESS}/{endpoint}", headers=headers, json=data)
-        elif method == "PATCH":
-            res = requests.patch(f"{SERVER_ADDRESS}/{endpoint}", headers=headers, json=data)
-        else:
-            raise Exception("Invalid method")
+        res = send(
+            method, 
+            f"{SERVER_ADDRESS}/{endpoint}", 
+            endpoint,
+            idempotency_key=idempotency_key,
+            headers=headers, 
+            json=data if method != "GET" else None, 
+            params=params, 
+            timeout=timeout or DEFAULT_TIMEOUT,
+            stream=stream
+        )
         return res
     
     except Exception as e:
@@ -136,6 +212,57 @@ def server_request(endpoint, method="GET", data=None, headers=None, params=None,
     return None
 
 
+@cached(ttl=3600 if not DEBUG else 5, stale_ttl=3600)
+def get_api_routes():
+    """
+    Returns the set of routes advertised by the API server's OpenAPI schema, as "METHOD /path".
+    Empty if the server does not publish one.
+    """
+    try:
+        res = server_request("openapi.json")
+        if res is not None and res.status_code == 200:
+            paths = res.json().get('paths', {})
+            return {f"{method.upper()} {path.strip('/')}" for path, methods in paths.items() for method in methods}
+    except Exception as e:
+        log.error(e)
+    
+    return set()
+
+def api_supports(endpoint, method="GET"):
+    """
+    Checks whether the API server advertises a route, e.g. api_supports("hunch_club/tips/batch", "PATCH").
+    """
+    return f"{method.upper()} {endpoint.strip('/')}" in get_api_routes()
+
+
+def bulk_apply(func, jobs:dict, max_workers=None, on_progress=None):
+    """
+    Runs func(key, payload) for every item in jobs concurrently, with bounded parallelism.
+    func runs in worker threads (no Streamlit calls there), should raise on failure and return a result on success.
+        jobs: dict = {key: payload} to apply.
+        max_workers: int = Max concurrent calls. Defaults to BULK_MAX_WORKERS.
+        on_progress: callable = Called as on_progress(done, total) from the calling thread after each job finishes.
+    Returns {key: (ok, result or error message)} once the last job lands.
+    """
+    results = {}
+    if not jobs:
+        return results
+    
+    max_workers = max(1, min(max_workers or BULK_MAX_WORKERS, len(jobs)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(func, key, payload): key for key, payload in jobs.items()}
+        for done, future in enumerate(as_completed(futures), start=1):
+            key = futures[future]
+            try:
+                results[key] = (True, future.result())
+            except Exception as e:
+                log.error(f"{key}: {e}")
+                results[key] = (False, str(e))
+            if on_progress: on_progress(done, len(jobs))
+    
+    return results
+
+
 def app_default_menu():
     return {
         "About":"Admin Dashboard for managing a FastAPI REST API Server."
@@ -196,58 +323,82 @@ def show_super_admin_login():
     with st.form(key="login_form"):
         st.write("Login")
         password = st.text_input("Password", type="password", key="password_login_form")
+        register_form_field("login_form", "password_login_form", ["password"])
         st.form_submit_button("Login")
     
     
+def register_form_field(form_id, key, path):
+    """
+    Records which widget key holds which (possibly nested) field of a form, so a submission can
+    be decoded from the form's own keys. Called by create_form_element for every widget it creates.
+        form_id: str = Key of the st.form.
+        key: str = Widget key.
+        path: tuple = Field path in the submitted data, e.g. ("platform", "telegram", "chat_id").
+    """
+    st.session_state.setdefault('_form_registry', {}).setdefault(form_id, {})[key] = tuple(path)
+
 def process_form_submission():
     # Form submission should be in the format: "FormSubmitter:{module_id}-{action}"
-    # Form fields should have a unique key value, and be in the format : "field_{module_id}"
+    # Form fields are looked up in the form registry (see register_form_field). Forms with no registered
+    # fields fall back to keys in the format: "field_{module_id}"
     # The 'action' is the name in lowercase of the button that was clicked.
     
     id = data = action = None
     # Process form changes and save the data to the database
     _ss = st.session_state
-    for k,v in _ss.items():
-        if k.startswith("FormSubmitter:") and v: # Form submitted = True
-            id = k.split(":")[1].split("-")[0]
-            action = k.split(":")[1].split("-")[1].lower()
-            # print("FORM SUBMITTED", module_id)
-            form_data = {k.replace(f"_{id}",""): v for k,v in _ss.items() if id in k and "FormSubmitter" not in k}
-            form_data2 = {}
-            for key, value in form_data.items():
-                # print("FORM FIELD", key, repr(value))
-                if '[' in key: # we have a list of items
-                    if key.split("[")[0] not in form_data2:
-                        form_data2[key.split("[")[0]] = []
-                    pass
-                    
-                elif "+" in key:
-                    key = key.split("+")
-                    _result = {}
-                    current_level = _result
-                    for _i, _k in enumerate(key):
-                        # print(_i, _k, value, current_level)
-                        if _k not in current_level:
-                            current_level[_k] = {}
-                        if _i == len(key)-1:
-                            current_level[_k] = value
-                        current_level = current_level[_k]
-                    # print("FINAL RESULT", type(_result), _result)
-                        # _result = _result[_k]
-                    # Merge _last to form_data2
-                    # form_data2 = {**form_data2, **_result}
-                    merge_dicts(form_data2, _result)
-                    
-                    # if key[0] not in form_data2:
-                    #     form_data2[key[0]] = {}
-                    # form_data2[key[0]][key[1]] = value
-                else:
-                    form_data2[key] = value
-            
-            data = form_data2
+    for k in [k for k in _ss.keys() if k.startswith("FormSubmitter:")]:
+        if not _ss[k]: continue # Form submitted = True
+        id, _, action = k.split(":", 1)[1].rpartition("-")
+        action = action.lower()
+        # print("FORM SUBMITTED", module_id)
+        fields = _ss.get('_form_registry', {}).get(id)
+        if not fields:
+            data = _scan_form_data(id)
+            break
+        
+        data = {}
+        for key, path in fields.items():
+            if key not in _ss: continue
+            level = data
+            for part in path[:-1]:
+                level = level.setdefault(part, {})
+            level[path[-1]] = _ss[key]
+        break
     # print("FORM DATA", id, action, data, repr(data))
     return id, data, action
 
+def _scan_form_data(id):
+    """
+    Decodes a form that registered no fields by scanning session_state for keys containing its id.
+    Nested fields are keyed "field+subfield_{id}".
+    """
+    _ss = st.session_state
+    form_data = {k.replace(f"_{id}",""): v for k,v in _ss.items() if id in k and "FormSubmitter" not in k and READONLY_KEY_SUFFIX not in k}
+    form_data2 = {}
+    for key, value in form_data.items():
+        # print("FORM FIELD", key, repr(value))
+        if '[' in key: # we have a list of items
+            if key.split("[")[0] not in form_data2:
+                form_data2[key.split("[")[0]] = []
+            pass
+            
+        elif "+" in key:
+            key = key.split("+")
+            _result = {}
+            current_level = _result
+            for _i, _k in enumerate(key):
+                # print(_i, _k, value, current_level)
+                if _k not in current_level:
+                    current_level[_k] = {}
+                if _i == len(key)-1:
+                    current_level[_k] = value
+                current_level = current_level[_k]
+            # Merge _last to form_data2
+            merge_dicts(form_data2, _result)
+        else:
+            form_data2[key] = value
+    return form_data2
+
 def merge_dicts(d1, d2):
     for key in d2:
         if key in d1 and isinstance(d1[key], dict) and isinstance(d2[key], dict):
@@ -294,7 +445,130 @@ def encode_datetimes_for_db(value):
         return value
 
 
-def create_form_element(form, label=None, value=None, key=None, help=None, disabled=False, use_columns=False, show_label=True, options=[], field=None, use_expander=(False, False)):
+@dataclass(frozen=True)
+class WidgetSpec:
+    """
+    Layout of one form field, derived from its schema entry: what create_form_element would render
+    for it, minus the value. Sections (dict values) hold their fields in children.
+    """
+    name: str
+    label: str
+    kind: str                   # "toggle", "number", "date", "time", "multiselect", "selectbox", "section", "textarea" or "text"
+    path: tuple
+    help: Optional[str] = None
+    options: tuple = ()
+    field: Optional[str] = None
+    password: bool = False
+    disabled: bool = False
+    show_label: bool = True
+    is_id: bool = False
+    children: tuple = ()
+
+
+# Sibling keys holding a field's metadata, e.g. "language_options" for "language"
+SPEC_SUFFIXES = ("_help", "_options", "_field", "_disabled")
+# Marks the keys of disabled widgets, which are never submitted
+READONLY_KEY_SUFFIX = ":disabled:"
+# Value types each widget kind can render; other kinds render anything but these
+KIND_TYPES = {"toggle": bool, "number": (int, float), "section": dict}
+
+def widget_kind(value, field=None, options=(), password=False):
+    """
+    Picks the widget for a value, in create_form_element's order of precedence.
+    """
+    if isinstance(value, bool): return "toggle"
+    if isinstance(value, (int, float)): return "number"
+    if isinstance(value, datetime.datetime) or field == "date": return "date"
+    if isinstance(value, datetime.time) or field == "time": return "time"
+    if isinstance(value, list) or options: return "multiselect" if field == "multiselect" else "selectbox"
+    if isinstance(value, dict): return "section"
+    if field == "textarea" and not password: return "textarea"
+    return "text"
+
+def kind_fits(kind, value):
+    """
+    Whether a compiled kind can render value, e.g. a platform sending a string where the schema has a number.
+    """
+    if kind in KIND_TYPES:
+        return isinstance(value, KIND_TYPES[kind]) and not (kind == "number" and isinstance(value, bool))
+    return not isinstance(value, (bool, int, float, dict))
+
+def compile_field(label, value, help=None, options=(), field=None, disabled=False, path=None):
+    """
+    Compiles one field into a WidgetSpec.
+    """
+    path = tuple(path) if path else (label,)
+    name = label
+    show_label = bool(label)
+    if not label: label = "-"
+    password = field == "password" or any(x in label.lower() for x in ['api','token','password'])
+    is_id = label.lower().strip() in ["id","_id"]
+    kind = widget_kind(value, field, options, password)
+    return WidgetSpec(
+        name=name,
+        label=to_snake_case(label),
+        kind=kind,
+        path=path,
+        help=help,
+        options=tuple(options or ()),
+        field=field,
+        password=password,
+        disabled=disabled or is_id,
+        show_label=show_label,
+        is_id=is_id,
+        children=compile_fields(value, path, disabled) if kind == "section" else (),
+    )
+
+def compile_fields(schema:dict, path=(), disabled=False, overrides=None):
+    """
+    Compiles a schema dict into WidgetSpecs, one per field, reading "<field>_help", "_options",
+    "_field" and "_disabled" siblings as metadata.
+        overrides: dict = Extra compile_field arguments per top-level field, e.g. {"publish_schedule": {"field": "time"}}.
+    """
+    specs = []
+    for k, v in schema.items():
+        if any(l in k for l in SPEC_SUFFIXES): continue
+        meta = {
+            "help": schema.get(k + "_help"),
+            "options": schema.get(k + "_options", []),
+            "field": schema.get(k + "_field"),
+            "disabled": disabled or bool(schema.get(k + "_disabled", False)),
+            **(overrides or {}).get(k, {}),
+        }
+        specs.append(compile_field(k, v, path=(*path, k), **meta))
+    return tuple(specs)
+
+_compiled_schemas = {}
+_compiled_by_id = {}
+_compiled_lock = threading.Lock()
+
+def compile_schema(schema:dict, overrides=None):
+    """
+    Returns the WidgetSpecs for a form schema, compiled once per distinct schema and shared by every
+    rerun and session. Specs are immutable; values are bound when rendering.
+    Schemas from the shared cache are the same object on every rerun, so they are looked up by identity
+    and only hashed the first time a new object is seen. The schema must not be mutated after compiling.
+    Overrides are compared by value: page scripts rebuild their constants on every rerun.
+        overrides: dict = See compile_fields.
+    """
+    hit = _compiled_by_id.get(id(schema))
+    # The entry holds the schema, so its id can't be reused while it is live
+    if hit is not None and hit[0] is schema and hit[1] == overrides:
+        return hit[2]
+    fingerprint = hashlib.sha1(json.dumps([schema, overrides], sort_keys=True, default=str).encode()).hexdigest()
+    specs = _compiled_schemas.get(fingerprint)
+    if specs is None:
+        specs = compile_fields(schema, overrides=overrides)
+    with _compiled_lock:
+        # Only a handful of schema versions are ever live
+        if len(_compiled_schemas) >= 32: _compiled_schemas.clear()
+        if len(_compiled_by_id) >= 32: _compiled_by_id.clear()
+        _compiled_schemas[fingerprint] = specs
+        _compiled_by_id[id(schema)] = (schema, overrides, specs)
+    return specs
+
+
+def create_form_element(form, label=None, value=None, key=None, help=None, disabled=False, use_columns=False, show_label=True, options=[], field=None, use_expander=(False, False), form_id=None, path=None, spec=None, readonly=False):
     """
     Generates the Streamlit form element based on the type of value.
         key: str = Starting key value for the form element. Format: "fieldname_id"
@@ -307,125 +581,107 @@ def create_form_element(form, label=None, value=None, key=None, help=None, disab
         options: list = List of options for the select/multiselect elements.
         field: str = Type of form element. Options: "password", "date", "time", "multiselect", "textarea"
         use_expander: tuple = Whether to use an expander to hide the form element. Format: (use expander, start expanded)
+        form_id: str = Key of the enclosing st.form. Widgets are registered with it for process_form_submission.
+        path: tuple = Field path in the submitted data. Defaults to (label,).
+        spec: WidgetSpec = Precompiled layout (see compile_schema). label, help, options, field and path are then ignored.
+        readonly: bool = Show disabled fields as plain text rather than disabled input widgets.
         
     """
-    # if 'time' in label: print(key, label,use_columns, show_label, type(value))
-    
-    _label_visibility = 'visible' if label else 'collapsed'
-    if not label: label = "-"
-    _type = "password" if label and any(x in label.lower() for x in ['api','token','password']) else "default"
-    if field == "password": _type = "password"
-    if label.lower().strip() in ["id","_id"]:
-        disabled = True
-        key = None
-    label = to_snake_case(label)
-    if not show_label: 
-        _label_visibility = "collapsed"
-        label = "-"
-    # if options and not isinstance(value, list):
-    #     value = [value]
-    if disabled:
-        key = random.randint(1,999999)
+    if spec is None or not kind_fits(spec.kind, value):
+        if spec is not None:
+            label, help, options, field, disabled, path = spec.name, spec.help, spec.options, spec.field, spec.disabled, spec.path
+        spec = compile_field(label, value, help=help, options=options, field=field, disabled=disabled, path=path)
+    if not show_label:
+        spec = replace(spec, show_label=False)
+    render_widget(form, spec, value, key, use_columns=use_columns, use_expander=use_expander, form_id=form_id, readonly=readonly)
+
+
+def readonly_key(key, spec:WidgetSpec, form_id, value):
+    """
+    Key for a disabled widget, derived from its key (or form and field path) plus a digest of its value.
+    Stable across reruns, so Streamlit keeps the widget, but a new value still gets a fresh widget
+    rather than the old one's state.
+    """
+    base = key if isinstance(key, str) else f"{form_id or ''}:{'+'.join(map(str, spec.path))}"
+    return f"{base}{READONLY_KEY_SUFFIX}{hashlib.sha1(repr(value).encode()).hexdigest()[:8]}"
+
+def render_readonly(form, spec:WidgetSpec, value):
+    """
+    Shows a disabled field's value as plain text instead of an input widget.
+    """
+    if spec.password:
+        text = "••••••••" if value else ""
+    elif spec.kind == "toggle":
+        text = "Yes" if value else "No"
+    elif isinstance(value, (list, tuple)):
+        text = ", ".join(map(str, value))
+    elif isinstance(value, datetime.time):
+        text = value.strftime("%H:%M")
+    else:
+        text = "" if value is None else str(value)
+    if spec.show_label: form.caption(spec.label)
+    form.text(text)
+
+
+def render_widget(form, spec:WidgetSpec, value, key, use_columns=False, use_expander=(False, False), form_id=None, readonly=False):
+    """
+    Renders a compiled field with its value. See create_form_element.
+    """
+    label = spec.label if spec.show_label else "-"
+    _label_visibility = "visible" if spec.show_label else "collapsed"
+    _type = "password" if spec.password else "default"
+    disabled = spec.disabled
+    help = spec.help
+    options = list(spec.options)
     if isinstance(use_expander, bool) or len(use_expander) != 2:
         use_expander = (use_expander, True)
-        
-    def col_split(label, value, key=None):
+    
+    if use_columns and spec.kind not in ["section", "textarea"] and not (spec.kind == "text" and isinstance(value, str) and len(value) > 100 and not spec.password):
         c1, c2 = form.columns(2)
-        # print(label, value, help)
         with c1:
-            # form.text_input(label, label, key= random.randint(1,999999), label_visibility="collapsed", type="default", disabled=True)
             form.write(label)
         with c2:
-            create_form_element(form, label, value, key=key, help=help, disabled=disabled, show_label=False, options=options, field=field)
+            render_widget(form, replace(spec, show_label=False), value, key, form_id=form_id, readonly=readonly)
             if help: form.caption(help)
-        
-    if isinstance(value, bool):
-        if use_columns:
-            col_split(label, value, key)
-        else:
-            form.toggle(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled)
-    elif isinstance(value, float) or isinstance(value, int):
-        if use_columns:
-            col_split(label, value, key)
-        else:
-            if isinstance(value, float):
-                form.number_input(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled)
-            else:
-                form.number_input(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled)
-                
-    elif isinstance(value, datetime.datetime) or field == "date":
-        if use_columns:
-            col_split(label, value, key)
-        else:
-            form.date_input(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled)
-    elif isinstance(value, datetime.time) or field == "time":
+        return
+    
+    if disabled and spec.kind != "section":
+        if readonly:
+            return render_readonly(form, spec, value)
+        key = readonly_key(key, spec, form_id, value)
+    elif form_id and isinstance(key, str) and spec.kind != "section":
+        register_form_field(form_id, key, spec.path)
+    
+    if spec.kind == "toggle":
+        form.toggle(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled)
+    elif spec.kind == "number":
+        form.number_input(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled)
+    elif spec.kind == "date":
+        form.date_input(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled)
+    elif spec.kind == "time":
         # Convert string to datetime.time
         if isinstance(value, str):
             hours_minutes = value.split(":")[:2]
             value = datetime.datetime.strptime(":".join(hours_minutes), "%H:%M").time()
-        # Format time into HH:MM
-        # value = value.strftime("%H:%M")
-        if use_columns:
-            col_split(label, value, key)
-        else:
-            form.time_input(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled, step=900 if not DEBUG else 60)
-    elif isinstance(value, list) or options:
-        # form.write(label)
-        # print(options, value)
-        if use_columns:
-            col_split(label, value, key)
-        else:
-            if field == "multiselect":
-                form.multiselect(label, options, key=key, help=help, label_visibility=_label_visibility, default=[v for v in value if v in options], disabled=disabled)
-            else:
-                _index = options.index(value) if options and value in options else 0
-                form.selectbox(label, options, key=key, help=help, label_visibility=_label_visibility, disabled=disabled, index=_index)
-        # with form.container(border=True):
-        #     for i, item in enumerate(value):
-        #         create_form_element(form, None, item, key=f"{key}[{i}]", help=help, disabled=disabled)
-        # form.multiselect(label, value, key=key, help=help, label_visibility=_label_visibility)
-    elif isinstance(value, dict):
-        items = value.items() #sorted(value.items(), key=lambda x: x[0])
-        
+        form.time_input(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled, step=900 if not DEBUG else 60)
+    elif spec.kind == "multiselect":
+        form.multiselect(label, options, key=key, help=help, label_visibility=_label_visibility, default=[v for v in value if v in options], disabled=disabled)
+    elif spec.kind == "selectbox":
+        _index = options.index(value) if options and value in options else 0
+        form.selectbox(label, options, key=key, help=help, label_visibility=_label_visibility, disabled=disabled, index=_index)
+    elif spec.kind == "section":
         form.subheader(label, divider=True, anchor=None)
-        # c1, c2 = form.columns(2)
         if help: form.caption(help)
         _block = form.expander(f"Click here to open/close {label} options...", expanded=use_expander[1]) if use_expander[0] else form.container(border=True)
         with _block:
-            # go through list and remove _help and _options and add them to the form correctly.
-            for k,v in items: #value.items():
-                _help = None
-                _field = None
-                _options = []
-                # if k == 'CronInterval': _help = "Default Interval in minutes. May be overridden by Cron Job config."
-                # if k == 'CronActive': _help = 'Enable or disable the cron job. Both this AND the cron job must be enabled for the module to run periodically.'
-                if any(l in k for l in ['_help','_options','_field']) : continue
-                
-                if k + "_help" in value:
-                    _help = value[k + "_help"]
-                if k + "_options" in value:
-                    _options = value[k + "_options"]
-                if k + "_field" in value:
-                    _field = value[k + "_field"]
-
-                create_form_element(form, k, v, key=f"{key}+{k}", help=_help, disabled=disabled, use_columns=True, field=_field, options=_options)
-                # with c1:
-                #     form.text_input(k, k, help=help,key= random.randint(1,999999), label_visibility="collapsed", type="default", disabled=True)
-                # with c2:
-                #     create_form_element(form, None, v, key=f"{key}+{k}", help=help, disabled=disabled)
-        # form.json( value, expanded=False)
-    elif isinstance(value, str):
-
-        if (len(value) > 100 or field == "textarea") and _type != "password":
-            form.text_area(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled)
-        else:
-            if use_columns:
-                col_split(label, value, key)
-            else:
-                form.text_input(label, value=value, key=key, help=help, label_visibility=_label_visibility, type=_type,  disabled=disabled)
-                # form.code( value)
+            for child in spec.children:
+                create_form_element(form, value=value.get(child.name), key=f"{key}+{child.name}", use_columns=True, form_id=form_id, spec=child, readonly=readonly)
+            # Keys the value has but the schema does not
+            known = {child.name for child in spec.children}
+            for k, v in value.items():
+                if k in known or any(l in k for l in SPEC_SUFFIXES): continue
+                create_form_element(form, k, v, key=f"{key}+{k}", disabled=disabled, use_columns=True, form_id=form_id, path=(*spec.path, k), readonly=readonly)
+    elif spec.kind == "textarea" or (isinstance(value, str) and len(value) > 100 and not spec.password):
+        form.text_area(label, value=value, key=key, help=help, label_visibility=_label_visibility, disabled=disabled)
     else:
-        if use_columns:
-            col_split(label, value, key)
-        else:
-            form.text_input(label, value=value, key=key, help=help, label_visibility=_label_visibility, type=_type, disabled=disabled)
+        form.text_input(label, value=value, key=key, help=help, label_visibility=_label_visibility, type=_type, disabled=disabled)
@@ -5,3 +5,45 @@ SERVER_ADDRESS = st.secrets["API_SERVER_ADDRESS"].strip("/")
 DEBUG = str(st.secrets["DEBUG"]).lower() == "true"
 BASEPATH = os.getcwd() #os.path.dirname(os.path.abspath(__file__))
 API_TOKEN = st.secrets["API_TOKEN"]
+
+# HTTP client: (connect, read) timeouts in seconds and connection pool sizes
+HTTP_CONNECT_TIMEOUT = float(st.secrets.get("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(st.secrets.get("HTTP_READ_TIMEOUT", 30))
+HTTP_POOL_CONNECTIONS = int(st.secrets.get("HTTP_POOL_CONNECTIONS", 4))
+HTTP_POOL_MAXSIZE = int(st.secrets.get("HTTP_POOL_MAXSIZE", 20))
+
+# Max concurrent API writes for bulk edits (tips, platforms)
+BULK_MAX_WORKERS = int(st.secrets.get("BULK_MAX_WORKERS", 8))
+# Max tips per hunch_club/tips/batch request
+TIPS_BATCH_SIZE = int(st.secrets.get("TIPS_BATCH_SIZE", 500))
+# Tip cache: seconds between incremental syncs, and between full reconciles
+TIPS_SYNC_INTERVAL = int(st.secrets.get("TIPS_SYNC_INTERVAL", 30))
+TIPS_RECONCILE_INTERVAL = int(st.secrets.get("TIPS_RECONCILE_INTERVAL", 3600))
+# Parse hunch_club/tips/all as it downloads, validating a batch at a time, instead of loading the whole body
+TIPS_STREAM = str(st.secrets.get("TIPS_STREAM", True)).lower() == "true"
+# Wire format asked for hunch_club/tips/all: "arrow" (Arrow IPC, JSON if the server does not offer it) or "json"
+TIPS_WIRE_FORMAT = str(st.secrets.get("TIPS_WIRE_FORMAT", "arrow")).lower()
+# Shared cache for API reads: "memory" (per replica) or "sqlite" (file shared by replicas on one volume).
+# The SQLite file holds pickled API responses, platform credentials included, and is unpickled on read:
+# anyone who can write to it can run code in the app. Keep it on a volume only the app can access.
+CACHE_BACKEND = str(st.secrets.get("CACHE_BACKEND", "memory")).lower()
+CACHE_PATH = st.secrets.get("CACHE_PATH", os.path.join(BASEPATH, ".cache", "admin_cache.sqlite"))
+# On-disk snapshots of the tip and platform caches, for a warm start after a restart. Off unless set:
+# the platforms snapshot stores credentials (bot tokens, API keys, passwords) in plain JSON, same trust rules as CACHE_PATH.
+SNAPSHOT_DIR = st.secrets.get("SNAPSHOT_DIR", "")
+# Health monitor: seconds between pings, max backoff while offline, failed pings before reporting offline
+HEALTH_CHECK_INTERVAL = int(st.secrets.get("HEALTH_CHECK_INTERVAL", 15))
+HEALTH_MAX_BACKOFF = int(st.secrets.get("HEALTH_MAX_BACKOFF", 300))
+HEALTH_FAILURE_THRESHOLD = int(st.secrets.get("HEALTH_FAILURE_THRESHOLD", 2))
+# Retry policy for API calls: max retries, backoff base/cap in seconds; circuit breaker failures and cooldown
+HTTP_MAX_RETRIES = int(st.secrets.get("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_BASE = float(st.secrets.get("HTTP_BACKOFF_BASE", 0.5))
+HTTP_BACKOFF_MAX = float(st.secrets.get("HTTP_BACKOFF_MAX", 10))
+BREAKER_FAILURE_THRESHOLD = int(st.secrets.get("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_COOLDOWN = int(st.secrets.get("BREAKER_COOLDOWN", 30))
+# Port serving Prometheus metrics at /metrics (0 = off; the Diagnostics page works either way)
+METRICS_PORT = int(st.secrets.get("METRICS_PORT", 0))
+# Profile every page run (sampling profiler, shown in the Debug expander): runs kept and seconds between samples
+PROFILE = str(st.secrets.get("PROFILE", False)).lower() == "true"
+PROFILE_KEEP = int(st.secrets.get("PROFILE_KEEP", 10))
+PROFILE_INTERVAL = float(st.secrets.get("PROFILE_INTERVAL", 0.005))
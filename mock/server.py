@@ -0,0 +1,404 @@
+"""
+Local stand-in for the Hunch Club API, for testing the admin offline.
+
+    python -m mock.server --port 8765 --tips 1000 --platforms 20 --latency 50
+
+Then point API_SERVER_ADDRESS in .streamlit/secrets.toml at http://127.0.0.1:8765/
+Only depends on the standard library, so it can run without the admin's requirements.
+Responses are gzipped for clients that accept it, and hunch_club/tips/all is also served as
+Arrow IPC (ARROW_STREAM_TYPE) to clients that ask for it when pyarrow is installed.
+"""
+import argparse
+import gzip
+import io
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+EVENT_TYPES = ["Football", "Tennis", "Basketball", "Horse Racing", "Ice Hockey"]
+MARKET_TYPES = ["Match Winner", "Over/Under", "Both Teams To Score", "Handicap"]
+CHANNELS = ["telegram", "twitter", "discord", "email"]
+LANGUAGES = ["en-US", "pt-BR", "es-ES", "de-DE"]
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+# Bodies smaller than this are sent uncompressed
+GZIP_MIN_SIZE = 1024
+ARROW_BATCH_SIZE = 10_000
+
+
+def generate_tips(count, days_back=365, days_forward=7, seed=0):
+    """
+    Generates count synthetic tips spread between days_back days ago and days_forward days ahead.
+    """
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    span = (days_back + days_forward) * 86400
+    tips = {}
+    for i in range(count):
+        _datetime = now - timedelta(days=days_back) + timedelta(seconds=rnd.randrange(span))
+        _id = f"{i:024x}"
+        tips[_id] = {
+            "_id": _id,
+            "datetime": _datetime.strftime(DATETIME_FORMAT),
+            "participants": [f"Team {rnd.randrange(500)}", f"Team {rnd.randrange(500)}"],
+            "event_name": f"Event {i}",
+            "event_type": rnd.choice(EVENT_TYPES),
+            "market_type": rnd.choice(MARKET_TYPES),
+            "selection": f"Selection {rnd.randrange(3)}",
+            "odds": round(rnd.uniform(1.1, 5.0), 2),
+            "description": "",
+            "language": "en-US",
+            "event_result": "",
+            "bet_result": rnd.choice(["", "Win", "Lose", "Void"]) if _datetime < now else "",
+            "odds_url": "",
+            "publish_free": rnd.random() < 0.3,
+            "publish_vip": rnd.random() < 0.5,
+            "updated_at": min(_datetime, now).isoformat(),
+        }
+    return tips
+
+
+def platform_fields():
+    """
+    Default platform schema as served by hunch_club/platform/fields: default values,
+    plus "<field>_options", "<field>_help" and "<field>_field" hints for the admin forms.
+    """
+    return {
+        "id": "",
+        "name": "",
+        "active": False,
+        "channel": "telegram",
+        "channel_options": CHANNELS,
+        "language": "en-US",
+        "language_options": LANGUAGES,
+        "publish_type": "free",
+        "publish_type_options": ["free", "vip", "results"],
+        "publish_schedule": "30 8 * * *",
+        "publish_schedule_help": "Time of day (UTC) to publish.",
+        "next_publish": datetime.utcnow().isoformat(),
+        "max_tips": 5,
+        "sort_by": "datetime",
+        "sort_by_options": ["datetime", "odds", "event_type"],
+        "sort_order": "asc",
+        "sort_order_options": ["asc", "desc"],
+        "group_by": "none",
+        "group_by_options": ["none", "event_type", "day"],
+        "tips_days_delta": 0,
+        "stake_amount": 10.0,
+        "use_icons": True,
+        "publish_if_no_tips": False,
+        "no_tips_message": "No tips today.",
+        "tips_format": "{event_name}: {selection} @ {odds}",
+        "tips_format_field": "textarea",
+        "tips_message": "",
+        "tips_message_field": "textarea",
+        "tips_photo": "",
+        "tips_filter": [],
+        "tips_filter_options": EVENT_TYPES,
+        "tips_filter_field": "multiselect",
+        "icons": {"win": "✅", "lose": "❌", "void": "⚪", "pending": "⏳"},
+        "platform": {
+            "telegram": {"bot_token": "", "chat_id": "", "chat_id_help": "Channel or group id.", "parse_mode": "HTML", "parse_mode_options": ["HTML", "Markdown"]},
+            "twitter": {"api_key": "", "api_secret": "", "access_token": "", "access_secret": ""},
+            "discord": {"webhook_url": "", "username": "Hunch Club"},
+            "email": {"smtp_host": "", "smtp_port": 587, "username": "", "password": "", "recipients": []},
+        },
+    }
+
+
+def generate_platforms(count, seed=0):
+    """
+    Generates count synthetic platforms based on platform_fields().
+    """
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    platforms = {}
+    for i in range(count):
+        _id = f"{i:024x}"
+        channel = rnd.choice(CHANNELS)
+        hour, minute = rnd.randrange(24), rnd.choice([0, 15, 30, 45])
+        platforms[_id] = {
+            "id": _id,
+            "name": f"Platform {i}",
+            "active": rnd.random() < 0.7,
+            "channel": channel,
+            # Some platforms predate the language field
+            **({"language": rnd.choice(LANGUAGES)} if rnd.random() < 0.95 else {}),
+            "publish_type": rnd.choice(["free", "vip", "results"]),
+            "publish_schedule": f"{minute} {hour} * * *",
+            "next_publish": (now + timedelta(days=1)).replace(hour=hour, minute=minute, second=0, microsecond=0).isoformat(),
+            "max_tips": rnd.randrange(1, 10),
+            "sort_by": "datetime",
+            "sort_order": rnd.choice(["asc", "desc"]),
+            "group_by": "none",
+            "tips_days_delta": rnd.randrange(-1, 2),
+            "stake_amount": round(rnd.uniform(1, 100), 2),
+            "use_icons": rnd.random() < 0.5,
+            "publish_if_no_tips": rnd.random() < 0.2,
+            "no_tips_message": "No tips today.",
+            "tips_format": "{event_name}: {selection} @ {odds}",
+            "tips_message": "",
+            "tips_photo": "",
+            "tips_filter": rnd.sample(EVENT_TYPES, rnd.randrange(0, 3)),
+            "icons": {"win": "✅", "lose": "❌", "void": "⚪", "pending": "⏳"},
+            "platform": {channel: {"chat_id": f"-100{rnd.randrange(10 ** 9)}"}},
+        }
+    return platforms
+
+
+class MockState:
+    """
+    In-memory data served by the mock API.
+        latency: float = Seconds added to every response, plus up to jitter seconds at random.
+        compress: bool = Gzip responses for clients that accept it.
+        arrow: bool = Serve hunch_club/tips/all as Arrow IPC to clients that ask for it (needs pyarrow).
+    """
+    def __init__(self, tips=1000, platforms=20, batch=True, seed=0, latency=0.0, jitter=0.0, compress=True, arrow=True):
+        self.lock = threading.Lock()
+        self.tips = generate_tips(tips, seed=seed)
+        self.platforms = generate_platforms(platforms, seed=seed)
+        self.batch = batch
+        self.latency = latency
+        self.jitter = jitter
+        self.compress = compress
+        self.arrow = arrow and pa is not None
+        self.calls = {}
+
+    def count(self, route):
+        with self.lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    Routes requests to handle_* methods. Each route is (method, regex, handler name).
+    """
+    protocol_version = "HTTP/1.1"
+    state: MockState = None
+
+    routes = [
+        ("GET", r"common/ping", "handle_ping"),
+        ("GET", r"openapi\.json", "handle_openapi"),
+        ("GET", r"admin/dashboard", "handle_dashboard"),
+        ("GET", r"hunch_club/tips/all", "handle_tips_all"),
+        ("GET", r"hunch_club/tips/history", "handle_tips_history"),
+        ("PATCH", r"hunch_club/tips/batch", "handle_tips_batch"),
+        ("GET", r"hunch_club/tips/(?P<id>[^/]+)", "handle_tip_get"),
+        ("PATCH", r"hunch_club/tips/(?P<id>[^/]+)", "handle_tip_patch"),
+        ("GET", r"hunch_club/platforms", "handle_platforms"),
+        ("GET", r"hunch_club/platform/fields", "handle_platform_fields"),
+        ("POST", r"hunch_club/platform", "handle_platform_create"),
+        ("POST", r"hunch_club/platform/test/(?P<id>[^/]+)", "handle_platform_test"),
+        ("PATCH", r"hunch_club/platform/(?P<id>[^/]+)", "handle_platform_patch"),
+        ("DELETE", r"hunch_club/platform/(?P<id>[^/]+)", "handle_platform_delete"),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        path = url.path.strip("/")
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = json.loads(self.rfile.read(length) or b"null") if length else None
+        if self.state.latency or self.state.jitter:
+            time.sleep(self.state.latency + random.uniform(0, self.state.jitter))
+
+        for _method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, path)
+            if _method == method and match:
+                if handler == "handle_tips_batch" and not self.state.batch:
+                    break
+                self.state.count(pattern)
+                return getattr(self, handler)(**match.groupdict())
+        self.send_json({"detail": "Not Found"}, status=404)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def send_body(self, body, content_type, status=200):
+        """
+        Sends body, gzipped if the client accepts it and the mock is not run with --no-compress.
+        """
+        if self.state.compress and len(body) >= GZIP_MIN_SIZE and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            encoding = "gzip"
+        else:
+            encoding = None
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data, status=200):
+        self.send_body(json.dumps(data).encode(), "application/json", status)
+
+    def accepts_arrow(self):
+        return self.state.arrow and ARROW_STREAM_TYPE in self.headers.get("Accept", "")
+
+    def send_arrow(self, rows):
+        """
+        Sends rows as an Arrow IPC stream, with datetime as a timestamp column.
+        """
+        table = pa.Table.from_pylist(rows)
+        if "datetime" in table.column_names:
+            index = table.column_names.index("datetime")
+            table = table.set_column(index, "datetime", pc.strptime(table["datetime"], format=DATETIME_FORMAT, unit="us"))
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=ARROW_BATCH_SIZE):
+                writer.write_batch(batch)
+        self.send_body(sink.getvalue(), ARROW_STREAM_TYPE)
+
+    # Routes
+
+    def handle_ping(self):
+        self.send_json({"data": "pong", "environment": "mock"})
+
+    def handle_openapi(self):
+        paths = {}
+        for _method, pattern, handler in self.routes:
+            if handler == "handle_tips_batch" and not self.state.batch:
+                continue
+            path = "/" + re.sub(r"\(\?P<(\w+)>[^)]*\)", r"{\1}", pattern).replace("\\", "")
+            paths.setdefault(path, {})[_method.lower()] = {}
+        self.send_json({"openapi": "3.1.0", "paths": paths})
+
+    def handle_dashboard(self):
+        self.send_json({"data": {"config": {"environment": "mock"}}})
+
+    def handle_tips_all(self):
+        since = self.query.get("updated_since")
+        with self.state.lock:
+            data = [tip for tip in self.state.tips.values() if not since or tip["updated_at"] >= since]
+        if self.accepts_arrow() and data:
+            return self.send_arrow(data)
+        self.send_json({"data": data})
+
+    def handle_tips_history(self):
+        page = max(int(self.query.get("page", 1)), 1)
+        page_size = int(self.query.get("page_size", 50))
+        date_from = self.query.get("date_from", "").replace("T", " ")
+        date_to = self.query.get("date_to", "").replace("T", " ")
+        event_type = self.query.get("event_type")
+        with self.state.lock:
+            data = [
+                tip for tip in self.state.tips.values()
+                if (not date_from or tip["datetime"] >= date_from)
+                and (not date_to or tip["datetime"] < date_to)
+                and (not event_type or tip["event_type"] == event_type)
+            ]
+        data.sort(key=lambda tip: tip["datetime"], reverse=True)
+        offset = (page - 1) * page_size
+        self.send_json({"data": data[offset:offset + page_size], "total": len(data)})
+
+    def _update_tip(self, id, data):
+        with self.state.lock:
+            if id not in self.state.tips:
+                return False, "Tip not found"
+            self.state.tips[id].update({k: v for k, v in (data or {}).items() if k != "_id"})
+            self.state.tips[id]["updated_at"] = datetime.utcnow().isoformat()
+        return True, None
+
+    def handle_tip_patch(self, id):
+        ok, error = self._update_tip(id, self.body)
+        if not ok:
+            return self.send_json({"detail": error}, status=404)
+        self.send_json({"data": self.state.tips[id]})
+
+    def handle_tip_get(self, id):
+        with self.state.lock:
+            tip = self.state.tips.get(id)
+        if tip is None:
+            return self.send_json({"detail": "Tip not found"}, status=404)
+        self.send_json({"data": tip})
+
+    def handle_platforms(self):
+        with self.state.lock:
+            data = list(self.state.platforms.values())
+        self.send_json({"data": data})
+
+    def handle_platform_fields(self):
+        self.send_json(platform_fields())
+
+    def handle_platform_create(self):
+        with self.state.lock:
+            _id = f"{len(self.state.platforms) + random.randrange(1 << 32):024x}"
+            self.state.platforms[_id] = {**(self.body or {}), "id": _id}
+        self.send_json({"data": self.state.platforms[_id]})
+
+    def handle_platform_test(self, id):
+        if id not in self.state.platforms:
+            return self.send_json({"detail": "Platform not found"}, status=404)
+        self.send_json({"data": "sent"})
+
+    def handle_platform_patch(self, id):
+        with self.state.lock:
+            if id not in self.state.platforms:
+                return self.send_json({"detail": "Platform not found"}, status=404)
+            self.state.platforms[id].update({k: v for k, v in (self.body or {}).items() if k != "id"})
+        self.send_json({"data": self.state.platforms[id]})
+
+    def handle_platform_delete(self, id):
+        with self.state.lock:
+            if self.state.platforms.pop(id, None) is None:
+                return self.send_json({"detail": "Platform not found"}, status=404)
+        self.send_json({"data": id})
+
+    def handle_tips_batch(self):
+        results = []
+        for item in (self.body or {}).get("items", []):
+            ok, error = self._update_tip(item.get("id"), item.get("data"))
+            results.append({"id": item.get("id"), "success": ok, "error": error})
+        self.send_json({"data": results})
+
+
+def make_server(host="127.0.0.1", port=8765, **kwargs):
+    """
+    Creates (but does not start) a mock API server. kwargs are passed to MockState.
+    """
+    handler = type("Handler", (MockHandler,), {"state": MockState(**kwargs)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Hunch Club API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tips", type=int, default=1000, help="Number of synthetic tips")
+    parser.add_argument("--platforms", type=int, default=20, help="Number of synthetic platforms")
+    parser.add_argument("--latency", type=float, default=0, help="Milliseconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0, help="Up to this many extra milliseconds, at random")
+    parser.add_argument("--no-batch", action="store_true", help="Do not serve/advertise hunch_club/tips/batch")
+    parser.add_argument("--no-compress", action="store_true", help="Never gzip responses")
+    parser.add_argument("--no-arrow", action="store_true", help="Always answer hunch_club/tips/all with JSON")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, tips=args.tips, platforms=args.platforms, batch=not args.no_batch, latency=args.latency / 1000, jitter=args.jitter / 1000, compress=not args.no_compress, arrow=not args.no_arrow)
+    print(f"Mock Hunch Club API on http://{args.host}:{args.port}/")
+    server.serve_forever()
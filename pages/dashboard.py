@@ -1,28 +1,5 @@
 import streamlit as st
-from core.utils import init, server_request
-from loguru import logger as log
-
-from core.vars import DEBUG
-
-@st.cache_resource(ttl=60 if not DEBUG else 5)
-def get_dashboard():
-    """
-    Returns dashboard metrics.
-    """
-    try:
-        res = server_request("admin/dashboard")
-        # print(res.status_code, res.text)
-        if res.status_code == 200:
-            data = res.json()
-            return data.get('data', [])
-        else:
-            st.error(f"Error fetching data: {res.status_code} {res.text}")
-        
-    except Exception as e:
-        log.error(e)
-        st.error(str(e))
-        
-    return None
+from core.utils import init, footer, get_dashboard
 
 
 def dashboard():
@@ -46,6 +23,8 @@ def dashboard():
                 # st.write(f"{k}: {v}")
             # st.write(value)
 
+    footer()
+
 
 if __name__ == "__main__":
     
@@ -0,0 +1,90 @@
+import streamlit as st
+import pandas as pd
+
+from core.utils import init, footer
+from core.metrics import metrics
+from core.vars import METRICS_PORT
+
+
+def ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def latency_table(histograms, name, label):
+    """
+    One row per label value of a latency histogram: calls, mean and estimated p50/p95/p99 in ms.
+    """
+    rows = []
+    for (metric, labels), hist in histograms.items():
+        if metric != name: continue
+        rows.append({
+            label: dict(labels).get(label),
+            "calls": hist.count,
+            "mean_ms": ms(hist.sum / hist.count) if hist.count else None,
+            "p50_ms": ms(hist.quantile(0.5)),
+            "p95_ms": ms(hist.quantile(0.95)),
+            "p99_ms": ms(hist.quantile(0.99)),
+            "total_s": round(hist.sum, 2),
+        })
+    return pd.DataFrame(rows)
+
+
+def diagnostics():
+
+    init()
+
+    st.header("🩺 Diagnostics")
+    st.caption("Metrics since this replica started. Percentiles are estimated from histogram buckets.")
+
+    counters, histograms = metrics.snapshot()
+
+    st.subheader("API Calls", divider=True)
+    calls = latency_table(histograms, "http_request_duration_seconds", "endpoint")
+    if calls.empty:
+        st.info("No API calls recorded yet.")
+    else:
+        sizes = {dict(labels)['endpoint']: hist for (metric, labels), hist in histograms.items() if metric == "http_response_bytes"}
+        calls['avg_kb'] = [round(sizes[e].sum / sizes[e].count / 1024, 1) if e in sizes and sizes[e].count else None for e in calls['endpoint']]
+        statuses = {}
+        for (metric, labels), value in counters.items():
+            if metric != "http_requests_total": continue
+            labels = dict(labels)
+            statuses.setdefault(labels['endpoint'], []).append(f"{labels['status']}: {value}")
+        calls['statuses'] = [", ".join(statuses.get(e, [])) for e in calls['endpoint']]
+        st.dataframe(calls.sort_values("total_s", ascending=False), hide_index=True, use_container_width=True)
+
+    st.subheader("Cache", divider=True)
+    results = {}
+    for (metric, labels), value in counters.items():
+        if metric != "cache_requests_total": continue
+        labels = dict(labels)
+        results.setdefault(labels['cache'], {"hit": 0, "stale": 0, "miss": 0})[labels['result']] = value
+    if not results:
+        st.info("No cache lookups recorded yet.")
+    else:
+        cache = pd.DataFrame([{"cache": name, **r, "hit_rate": round((r['hit'] + r['stale']) / max(1, sum(r.values())), 3)} for name, r in results.items()])
+        st.dataframe(cache, hide_index=True, use_container_width=True)
+
+    st.subheader("Page Runs and Decoding", divider=True)
+    c1, c2 = st.columns(2)
+    with c1:
+        st.caption("Script run time per page")
+        st.dataframe(latency_table(histograms, "page_run_duration_seconds", "page"), hide_index=True, use_container_width=True)
+    with c2:
+        st.caption("JSON parsing and validation")
+        st.dataframe(latency_table(histograms, "decode_duration_seconds", "stage"), hide_index=True, use_container_width=True)
+
+    st.subheader("Prometheus", divider=True)
+    text = metrics.render()
+    if METRICS_PORT:
+        st.caption(f"Scrape :{METRICS_PORT}/metrics")
+    st.download_button("Download metrics", text, file_name="metrics.txt", mime="text/plain")
+    with st.expander("Raw metrics"):
+        st.code(text, language="text")
+
+    footer()
+
+
+if __name__ == "__main__":
+
+    diagnostics()
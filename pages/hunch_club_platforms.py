@@ -2,21 +2,32 @@ import streamlit as st
 import requests
 from loguru import logger as log
 from time import sleep
+from copy import deepcopy
 from datetime import datetime, time
-from core.utils import init, server_request, to_snake_case, create_form_element, process_form_submission, merge_dicts, recursive_walk, encode_datetimes_for_db, filter_dict
+from uuid import uuid4
+from core.utils import init, footer, flash, bulk_apply, server_request, to_snake_case, create_form_element, compile_schema, process_form_submission, merge_dicts, recursive_walk, encode_datetimes_for_db, filter_dict
 from core.vars import DEBUG
+from core.cache import cached
 
-@st.cache_resource(ttl=60 if not DEBUG else 5)
+# Form fields whose widget differs from what the schema value implies
+PLATFORM_FORM_OVERRIDES = {
+    "next_publish": {"disabled": True},      # Set by the server
+    "publish_schedule": {"field": "time"},   # Cron in the API, a time of day in the UI
+}
+
+@cached(ttl=60 if not DEBUG else 5, stale_ttl=300, snapshot=True)
 def get_platforms():
     """
-    Gets all tips.
+    Gets all platforms, keyed by id (in API order), so pages look them up directly.
     """
     try:
         res = server_request("hunch_club/platforms")
+        if res is None:
+            raise Exception("No response from server")
         # print(res.status_code, res.json())
         if res.status_code == 200:
             data = res.json()
-            return data.get('data', [])
+            return {str(platform['id']): platform for platform in data.get('data', [])}
         else:
             st.error(f"Error fetching data: {res.status_code} {res.text}")
         
@@ -26,7 +37,13 @@ def get_platforms():
         
     return None
 
-@st.cache_resource(ttl=86400 if not DEBUG else 5)
+def platform_label(platform):
+    """
+    Label shown for a platform in the selectbox.
+    """
+    return f"{'🟢' if platform.get('active',False) else '🔴'} [{platform.get('channel')}] [{str(platform.get('language') or '-').upper()}] [{platform.get('publish_type')}] [{','.join(platform.get('tips_filter') or [])}] {platform.get('name') or '<No Name>'}"
+
+@cached(ttl=86400 if not DEBUG else 5, stale_ttl=86400)
 def get_default_schema():
     """
     Gets all tips.
@@ -34,7 +51,7 @@ def get_default_schema():
     try:
         default_schema = server_request("hunch_club/platform/fields")
         # print(default_schema)
-        if not default_schema.status_code == 200:
+        if default_schema is None or not default_schema.status_code == 200:
             raise Exception("Error fetching default schema")
         return default_schema.json()
     except Exception as e:
@@ -42,16 +59,71 @@ def get_default_schema():
         
     return None
 
+def cron_schedule(data:dict):
+    """
+    Converts a "HH:MM" publish_schedule from the UI back to cron format, in place.
+    """
+    _schedule = data.get("publish_schedule", "")
+    _schedule = _schedule.split(":") if ":" in _schedule else None
+    _schedule = f"{_schedule[1]} {_schedule[0]} * * *" if _schedule else data.get("publish_schedule", "")
+    if 'publish_schedule' in data: data['publish_schedule'] = _schedule
+    return data
+
+def schedule_time(cron):
+    """
+    Converts a daily cron publish_schedule ("M H * * *") to a time of day for the UI, 8:30am if unset.
+    """
+    if not cron or cron == "None":
+        cron = "30 8 * * *" # Default to 8:30am
+    minute, hour = cron.split(" ")[:2]
+    return time(int(hour), int(minute))
+
+def delete_platform(id):
+    """
+    Deletes a platform. Raises on failure, safe to call from worker threads.
+    """
+    results = server_request(f"hunch_club/platform/{id}", method="DELETE")
+    if results is None:
+        raise Exception("No response from server")
+    if not results.status_code == 200:
+        raise Exception(results.text)
+    log.info("Platform Deleted")
+    return True
+
+def update_platform(id, data):
+    """
+    Updates a platform. Raises on failure, safe to call from worker threads.
+    """
+    # Catch publish_schedule and convert to cron format
+    cron_schedule(data)
+    # if 'next_publish' in data: # Remove this as it is defined on the server
+    #     del data['next_publish']
+    results = server_request(f"hunch_club/platform/{id}", method="PATCH", data=data, idempotency_key=str(uuid4()))
+    if results is None:
+        raise Exception("No response from server")
+    if not results.status_code == 200:
+        raise Exception(results.text)
+    return True
+
+def create_platform(data):
+    """
+    Creates a platform. Raises on failure, safe to call from worker threads.
+    """
+    cron_schedule(data)
+    if 'next_publish' in data: # Remove this as it is defined on the server
+        del data['next_publish']
+    # Sent without an idempotency key, so it is never retried: nothing guarantees the server dedupes creates,
+    # and a retried POST could create the platform twice
+    results = server_request("hunch_club/platform", method="POST", data=data)
+    if results is None:
+        raise Exception("No response from server")
+    if not results.status_code == 200:
+        raise Exception(results.text)
+    return True
+
 def to_delete(id):
     try:
-        st.info("Deleting platform...")
-        # st.snow()
-        sleep(1)
-        # results = await hunchclub_mongodb.delete_by_id(id)
-        results = server_request(f"hunch_club/platform/{id}", method="DELETE")
-        if not results.status_code == 200:
-            raise Exception(results.text)
-        log.info("Platform Deleted")
+        delete_platform(id)
         get_platforms.clear()
         return True
     except Exception as e:
@@ -60,19 +132,7 @@ def to_delete(id):
     
 def to_update(id, data):
     try:
-        # Catch publish_schedule and convert to cron format
-        print(id, type(data), data)
-        _schedule = data.get("publish_schedule", "")
-        _schedule = _schedule.split(":") if ":" in _schedule else None
-        _schedule = f"{_schedule[1]} {_schedule[0]} * * *" if _schedule else data.get("publish_schedule", "")
-        if 'publish_schedule' in data: data['publish_schedule'] = _schedule
-        # if 'next_publish' in data: # Remove this as it is defined on the server
-        #     del data['next_publish']
-        # print(id, data)
-        results = server_request(f"hunch_club/platform/{id}", method="PATCH", data=data)
-        # print("UPDATE QUERY", results.text)  
-        if not results.status_code == 200:
-            raise Exception(results.text)
+        update_platform(id, data)
         get_platforms.clear()
         return True
     except Exception as e:
@@ -81,25 +141,66 @@ def to_update(id, data):
 
 def to_create(data):
     try:
-        # Catch publish_schedule and convert to cron format
-        # print(data)
-        _schedule = data.get("publish_schedule", "")
-        _schedule = _schedule.split(":") if ":" in _schedule else None
-        _schedule = f"{_schedule[1]} {_schedule[0]} * * *" if _schedule else data.get("publish_schedule", "")
-        data['publish_schedule'] = _schedule
+        data.setdefault('publish_schedule', "")
         data['name'] = data['name'] + " (Copy)"
-        if 'next_publish' in data: # Remove this as it is defined on the server
-            del data['next_publish']
-        results = server_request("hunch_club/platform", method="POST", data=data) 
-        # print("UPDATE QUERY", results.text)  
-        if not results.status_code == 200:
-            raise Exception(results.text)
+        create_platform(data)
         get_platforms.clear()
         return True
     except Exception as e:
         log.error(e)
         return False
 
+def summary_jobs(changes:dict, summary:list, new_platform:dict):
+    """
+    Diffs the Quick Summary data editor state into bulk jobs, {key: (action, platform id, data)}.
+    Deleted rows win over edits to the same row. Added rows are created from new_platform (the default schema).
+        changes: dict = The data editor state: edited_rows, deleted_rows, added_rows.
+        summary: list = Rows the data editor was given, in order.
+    """
+    jobs = {}
+    for index in changes.get('deleted_rows', []):
+        id = summary[index]['id']
+        jobs[id] = ("delete", id, None)
+    for index, row in changes.get('edited_rows', {}).items():
+        id = summary[int(index)]['id']
+        if id not in jobs:
+            jobs[id] = ("update", id, dict(row))
+    for index, row in enumerate(changes.get('added_rows', [])):
+        jobs[f"new_{index}"] = ("create", None, {**new_platform, **{k: v for k, v in row.items() if v is not None}})
+    return jobs
+
+def apply_platform_job(key, job):
+    action, id, data = job
+    if action == "delete":
+        return delete_platform(id)
+    if action == "update":
+        return update_platform(id, data)
+    return create_platform(data)
+
+def apply_summary_changes(jobs:dict, platforms:dict):
+    """
+    Applies the Quick Summary jobs concurrently with a progress bar, refreshes the platforms once,
+    and keeps a per-row result table to show on the next run.
+        platforms: dict = Platforms by id, for the names in the result table.
+    """
+    progress = st.progress(0.0, text="Saving changes...")
+    results = bulk_apply(apply_platform_job, jobs, on_progress=lambda done, total: progress.progress(done / total, text=f"Saved {done}/{total} platforms"))
+    get_platforms.clear()
+    
+    rows = []
+    for key, (ok, error) in results.items():
+        action, id, data = jobs[key]
+        name = (platforms.get(id, {}) if id else data).get('name')
+        rows.append({"platform": name or "<No Name>", "action": action, "result": "✅" if ok else "❌", "error": None if ok else error})
+    st.session_state['platform_summary_results'] = rows
+    errors = [key for key, (ok, _) in results.items() if not ok]
+    if errors:
+        flash(f"Saved {len(results) - len(errors)}/{len(results)} platform changes", "warning")
+    else:
+        flash(kind="balloons")
+        flash(f":white_check_mark: {len(results)} platform changes saved")
+    st.rerun()
+
 
 
 if __name__ == "__main__":
@@ -117,7 +218,7 @@ if __name__ == "__main__":
     
     # st.write("This is the tips page")
     
-    platforms = get_platforms()
+    platforms = get_platforms() or {}
     
 
     # st.dataframe(platforms)
@@ -129,11 +230,9 @@ if __name__ == "__main__":
         get_default_schema.clear()
         st.stop()
 
-    ids = [str(x['id']) for x in platforms]
-    
     id, form_data, action = process_form_submission()
     
-    if id in ids and form_data:
+    if id in platforms and form_data:
         # Form submitted
         
         # print("ACTION>>>>>>", action)
@@ -161,8 +260,12 @@ if __name__ == "__main__":
             st.rerun()
 
         if action == "duplicate":
-            # Duplicating item
-            if to_create(form_data):
+            # Duplicating item. Closed sections are not submitted, so they are copied from the stored platform.
+            data = deepcopy(platforms[id])
+            data.pop('id', None)
+            data.pop('next_publish', None)
+            merge_dicts(data, form_data)
+            if to_create(data):
                 st.success(":white_check_mark: Platform Duplicated")
             else:
                 st.error("Error duplicating platform")
@@ -173,7 +276,10 @@ if __name__ == "__main__":
         if action == 'test platform':
             # Send test
             result = server_request(f"hunch_club/platform/test/{id}", method="POST")
-            if result.status_code != 200:
+            if result is None:
+                st.error("No response from server", icon="🚨")
+                st.stop()
+            elif result.status_code != 200:
                 st.error(f"API returned status code {result.status_code}: {result.text}", icon="🚨")
                 log.error(f"API returned status code {result.status_code}: {result.text}")
                 st.stop()
@@ -193,7 +299,7 @@ if __name__ == "__main__":
     # print(len(platforms))
     
     # drop columns
-    for platform in platforms:
+    for platform in platforms.values():
         _plat = {}
         # for k in platform.keys():
         for k in default_schema.keys():
@@ -222,13 +328,7 @@ if __name__ == "__main__":
             # Override publish_schedule to be a time field for the UI, convert it back before saving it.
             _v = platform.get(k, default_schema[k])
             if k == "publish_schedule":
-                print(_v)
-                if not _v or _v == "None":
-                    _v = "30 8 * * *" # Default to 8:30am
-                time_value = _v.split(" ")
-                # time_value = f"{time_value[1]}:{time_value[0]}"
-                time_value = time( int(time_value[1]),  int(time_value[0]) )
-                _v = time_value
+                _v = schedule_time(_v)
             if k == 'next_publish':
                 try:
                     _v = datetime.fromisoformat(_v).strftime("%B %d, %Y, %H:%M")
@@ -242,34 +342,15 @@ if __name__ == "__main__":
 
     st.subheader("Quick Summary", divider=True)
     
+    if st.session_state.get('platform_summary_results'):
+        with st.expander("Last save", expanded=True):
+            st.dataframe(st.session_state.pop('platform_summary_results'), hide_index=True, use_container_width=True)
+    
     if st.session_state.get('platform_summary',None):
         # st.write(st.session_state.get('platform_summary',None))
-        _changes = st.session_state.get('platform_summary',{})
-        if st.button("Save Changes", use_container_width=True, type="primary"):
-            st.info("Saving changes...")
-            for i, plat in enumerate(_quick_summary):
-                # Delete
-                if _changes.get('deleted_rows',[]):
-                    if i in _changes['deleted_rows']:
-                        # print("DELETED",i,plat['id'])
-                        if to_delete(plat['id']):
-                            st.success(":white_check_mark: Platform Deleted")
-                        else:
-                            st.error("Error deleting platform")
-                        continue
-                # Update
-                if _changes.get('edited_rows',{}):
-                    if i in _changes['edited_rows'].keys():
-                        # print("EDITED",i,plat['id'])
-                        if to_update(plat['id'], _changes['edited_rows'][i]):
-                            st.success(":white_check_mark: Platform Updated")
-                        else:
-                            st.error("Error updating platform")
-
-                    
-            
-            st.balloons()
-            st.rerun()
+        _jobs = summary_jobs(st.session_state.get('platform_summary',{}), _quick_summary, filter_dict(default_schema, ["_help","_options","_field"], exclude=True))
+        if _jobs and st.button("Save Changes", use_container_width=True, type="primary"):
+            apply_summary_changes(_jobs, platforms)
             
     st.data_editor(_quick_summary, use_container_width=True, column_config={
                 "next_publish": st.column_config.TextColumn(
@@ -326,87 +407,66 @@ if __name__ == "__main__":
             
     
     st.subheader("Platforms", divider=True)
-    _names = [f"{'🟢' if x.get('active',False) else '🔴'} [{x.get('channel')}] [{x.get('language').upper()}] [{x.get('publish_type')}] [{','.join(x.get('tips_filter',[]))}] {x.get('name') or '<No Name>'}" for x in platforms]
-    selected_platform = st.selectbox("Select Platform", _names, key="hunch_club_selected_platform", index=None)
+    selected_platform = st.selectbox("Select Platform", list(platforms), format_func=lambda id: platform_label(platforms[id]), key="hunch_club_selected_platform", index=None)
+    platform = platforms.get(selected_platform)
     
-    if selected_platform:
-        for platform in platforms:
-            
-            if selected_platform != f"{'🟢' if platform.get('active',False) else '🔴'} [{platform.get('channel')}] [{platform.get('language').upper()}] [{platform.get('publish_type')}] [{','.join(platform.get('tips_filter',[]))}] {platform.get('name') or '<No Name>'}":
-                continue
-            
-            # st.write(platform['id'])
+    if platform:
+        
+        # st.write(platform['id'])
+
+        # with st.expander(f"{'🟢' if platform.get('active',False) else '🔴'} [{platform.get('channel')}] {platform.get('name') or '<No Name>'}"):
+        
+        specs = compile_schema(default_schema, overrides=PLATFORM_FORM_OVERRIDES)
+        # Picked outside the form so opening a section reruns straight away. Sections left closed
+        # are not submitted, so saving leaves them as they are on the server.
+        sections = {spec.name: spec.label for spec in specs if spec.kind == "section"}
+        open_sections = st.multiselect("Nested settings", list(sections), format_func=sections.get, key=f"open_sections_{platform['id']}", placeholder="Choose sections to edit", help="Nested settings are only loaded when opened") if sections else []
+        
+        with st.form(key=str(platform['id'])):
+            # form = st.form(key=str(module['_id']))
+            # form.text_input("ID", module['_id'], disabled=True)
+            # form.text_input("ModuleName", module['config']['ModuleName'], key="ModuleName_"+str(module['_id']), disabled=True)
+            # Sort items by key
 
-            # with st.expander(f"{'🟢' if platform.get('active',False) else '🔴'} [{platform.get('channel')}] {platform.get('name') or '<No Name>'}"):
+            # c1,c2 = st.columns([1,1])
+            # with c1:
+            cc1,cc2,cc3,cc4 = st.columns(4)
+            with cc1:
+                st.form_submit_button("Save", type="primary", use_container_width=True) 
+            with cc2:
+                st.form_submit_button("Delete", type="secondary", use_container_width=True)
+            with cc3:
+                st.form_submit_button("Duplicate", type="secondary", use_container_width=True)
+            with cc4:
+                st.form_submit_button("Test Platform", type="primary", use_container_width=True)
             
-            with st.form(key=str(platform['id'])):
-                # form = st.form(key=str(module['_id']))
-                # form.text_input("ID", module['_id'], disabled=True)
-                # form.text_input("ModuleName", module['config']['ModuleName'], key="ModuleName_"+str(module['_id']), disabled=True)
-                # Sort items by key
+            st.divider()
 
-                # c1,c2 = st.columns([1,1])
-                # with c1:
-                cc1,cc2,cc3,cc4 = st.columns(4)
-                with cc1:
-                    st.form_submit_button("Save", type="primary", use_container_width=True) 
-                with cc2:
-                    st.form_submit_button("Delete", type="secondary", use_container_width=True)
-                with cc3:
-                    st.form_submit_button("Duplicate", type="secondary", use_container_width=True)
-                with cc4:
-                    st.form_submit_button("Test Platform", type="primary", use_container_width=True)
+            # Layout is compiled once per schema version, only the platform's values are bound here
+            for spec in specs:
+                k = spec.name
+                if k == "id": continue
+                # Nested sections are only built once opened, the rest of the form stays cheap
+                if spec.kind == "section" and k not in open_sections:
+                    continue
+                # Get value from platform row
+                value = default_schema[k]
                 
-                st.divider()
-
-                items = default_schema.items() #sorted(default_schema.items(), key=lambda x: x[0])
-                for k, value in items: # default_schema.items():
-                    if k == "id": continue
-                    # Get value from platform row
-                    # print(k, value)
-                    
-                    # Merge new dict into old dict, so nested dicts are also updated
-                    if isinstance(value, dict): 
-                        # print("MERGING DICTS", value, platform.get(k, {}) )
-                        merge_dicts(value, platform.get(k, {}))
-                        # print("Platform>>>", k, value, type(value))
-                    else:
-                        value = platform.get(k, value)
-                    # if k == "ModuleName": continue
-                    _help = None
-                    _field = None
-                    _options = []
-                    _disabled = False
-                    # if k == 'CronInterval': _help = "Default Interval in minutes. May be overridden by Cron Job config."
-                    # if k == 'CronActive': _help = 'Enable or disable the cron job. Both this AND the cron job must be enabled for the module to run periodically.'
-                    if any(l in k for l in ['_help','_options','_field', '_disabled']) : continue
-                    
-                    if k + "_help" in default_schema:
-                        _help = default_schema[k + "_help"]
-                    if k + "_options" in default_schema:
-                        _options = default_schema[k + "_options"]
-                    if k + "_field" in default_schema:
-                        _field = default_schema[k + "_field"]
-                    if k + "_disabled" in default_schema:
-                        _disabled = bool(default_schema[k + "_disabled"])
+                # Merge the platform's dict into a copy of the default, so nested dicts are also updated
+                # without touching the schema shared by every session
+                if isinstance(value, dict): 
+                    value = deepcopy(value)
+                    merge_dicts(value, platform.get(k) or {})
+                else:
+                    value = platform.get(k, value)
+                
+                if k in ['next_publish']:
+                    value = datetime.fromisoformat(value).strftime("%B %d, %Y, %H:%M")
                     
-                    if k in ['next_publish']:
-                        value = datetime.fromisoformat(value).strftime("%B %d, %Y, %H:%M")
-                        _disabled = True
-                        
-                        
-                    # Override publish_schedule to be a time field for the UI, convert it back before saving it.
-                    if k == "publish_schedule":
-                        # print(value)
-                        # if not value or value == "None":
-                        #     value = "30 8 * * *" # Default to 8:30am
-                        # time_value = value.split(" ")
-                        # time_value = f"{time_value[1]}:{time_value[0]}"
-                        create_form_element(st, k, value=time_value, key = k+"_"+str(platform['id']), help = _help, use_columns=True, options = _options, field="time", disabled=_disabled)
-                        
-                    # elif k == "platform" or k == "icons":
-                        # create_form_element(st, k, value=value, key = k+"_"+str(platform['id']), help = _help, use_columns=True, options = _options, field=_field, disabled=_disabled, use_expander=(True, False))
-                        
-                    else:
-                        create_form_element(st, k, value=value, key = k+"_"+str(platform['id']), help = _help, use_columns=True, options = _options, field=_field, disabled=_disabled, use_expander=(True, False))  
+                # Override publish_schedule to be a time field for the UI, convert it back before saving it.
+                if k == "publish_schedule":
+                    value = schedule_time(value)
                     
+                create_form_element(st, value=value, key = k+"_"+str(platform['id']), use_columns=True, use_expander=(True, False), form_id=str(platform['id']), spec=spec, readonly=True)
+
+    footer()
@@ -1,40 +1,103 @@
 import streamlit as st
+import pandas as pd
 from loguru import logger as log
 from datetime import datetime, timedelta
-from time import sleep
 from random import randint
+from uuid import uuid4
 
-from core.vars import DEBUG
-from core.utils import init, server_request, to_snake_case, create_form_element, process_form_submission, merge_dicts
-from schema.hunch_club import TipSchema
+from core.vars import DEBUG, TIPS_BATCH_SIZE, TIPS_SYNC_INTERVAL, TIPS_RECONCILE_INTERVAL
+from core.utils import init, footer, server_request, to_snake_case, create_form_element, process_form_submission, merge_dicts, bulk_apply, flash, api_supports, fragment
+from core.cache import cached
+from core.tips import TipCache, TIP_COLUMNS, page_tips
+from schema.hunch_club import decode_tips
 
 # # from rich import print
 
-@st.cache_resource(ttl=3600 if not DEBUG else 5)
+TIP_GRID_COLUMN_ORDER = ("datetime",  "event_type", "event_name", "participants",  "publish_free", "publish_vip", "event_result", "bet_result", "market_type", "selection", "odds", "description")
+
+# Upcoming tips: pick what to publish, results are not known yet
+UPCOMING_TIP_COLUMNS = {
+    "_id" : None,
+    "datetime" : st.column_config.DatetimeColumn(label="Date", format="YYYY.MM.DD, HH:mm"),
+    "participants" : "Participants",
+    "event_name" : "Event Name",
+    "event_type" : "Event Type",
+    "market_type": "Market Type",
+    "selection" : "Selection",
+    "odds" : "Odds",
+    "event_result" : None,
+    "bet_result" : None,
+    "publish_free": st.column_config.CheckboxColumn(label="Free Tip"),
+    "publish_vip": st.column_config.CheckboxColumn(label="Premium Tip"),
+}
+
+# Played tips: only the results are editable
+RESULT_TIP_COLUMNS = {
+    "_id" : None,
+    "description" : None,
+    "datetime" : st.column_config.DatetimeColumn(label="Date", format="YYYY.MM.DD, HH:mm"),
+    "participants" : "Participants",
+    "event_name" : "Event Name",
+    "event_type" : "Event Type",
+    "market_type": "Market Type",
+    "selection" : "Selection",
+    "odds" : "Odds",
+    "event_result" : "Event Result",
+    "bet_result" :st.column_config.SelectboxColumn(label="Bet Result", options=["Win", "Lose", "Void"]),
+    "publish_free": st.column_config.CheckboxColumn(label="Free Tip", disabled=True),
+    "publish_vip": st.column_config.CheckboxColumn(label="Premium Tip", disabled=True),
+}
+
+@st.cache_resource
+def get_tip_cache():
+    """
+    Returns the tip cache shared by all sessions.
+    """
+    return TipCache(sync_interval=TIPS_SYNC_INTERVAL if not DEBUG else 5, reconcile_interval=TIPS_RECONCILE_INTERVAL, snapshot="tips")
+
+
 def get_tips():
     """
-    Gets all tips.
+    Gets all tips as a DataFrame sorted newest first, fetching only what changed since the last sync.
     """
+    cache = get_tip_cache()
     try:
-        res = server_request("hunch_club/tips/all")
-        # print(res.status_code, res.json())
+        cache.refresh()
+    except Exception as e:
+        log.error(e)
+        st.error(str(e))
+    if cache.last_error:
+        st.warning(f"Showing cached tips, last refresh failed: {cache.last_error}")
+    
+    if cache.errors:
+        with st.expander(f"⚠️ {len(cache.errors)} malformed tips skipped"):
+            st.write("\n".join(f"- Row {index}: {error}" for index, error in cache.errors))
+        
+    return cache.frame()
+
+
+@cached(ttl=60 if not DEBUG else 5, stale_ttl=60)
+def get_tips_page(page:int, page_size:int, date_from=None, date_to=None, event_type=None):
+    """
+    Gets one page of older tips, newest first, filtered on the server.
+    Request:  GET hunch_club/tips/history?page=&page_size=&date_from=&date_to=&event_type=
+    Response: {"data": [tip, ...], "total": int}
+    Returns (DataFrame, total) or (None, 0).
+    """
+    try:
+        params = {"page": page, "page_size": page_size, "date_from": date_from, "date_to": date_to, "event_type": event_type}
+        params = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in params.items() if v}
+        res = server_request("hunch_club/tips/history", params=params)
+        if res is None:
+            raise Exception("No response from server")
         if res.status_code == 200:
-            data = res.json().get('data', [])
-            new_data = []
-            for tip in data:
-                # Reformat datetime 
-                try:
-                    tip['datetime'] = datetime.strptime(tip['datetime'], "%Y-%m-%d %H:%M:%S")
-                    tip['id'] = str(tip['_id'])
-                    
-                    # Change the format to "YYYY-MM-DD HH:MM"
-                    # tip['datetime'] = tip['datetime'].strftime("%Y-%m-%d, %H:%M")
-                except Exception as e:
-                    log.error(e)
-                    pass
-                new_data.append(TipSchema(**tip).model_dump())
-                
-            return new_data
+            data = res.json()
+            tips, errors = decode_tips(data.get('data', []))
+            for index, error in errors:
+                log.warning(f"Skipped malformed tip at row {index}: {error}")
+            frame = pd.DataFrame(tips, columns=TIP_COLUMNS)
+            frame['datetime'] = pd.to_datetime(frame['datetime'])
+            return frame, data.get('total', len(frame))
         else:
             st.error(f"Error fetching data: {res.status_code} {res.text}")
         
@@ -42,60 +105,153 @@ def get_tips():
         log.error(e)
         st.error(str(e))
         
-    return None
+    return None, 0
+
+
+@fragment
+def show_previous_tips(tips, before:datetime):
+    """
+    Shows tips older than before, one page at a time. Only the current page is fetched and sent to the browser.
+    Runs as a fragment, so paging and filtering leave the grids above alone.
+    Pages come from the server when it has a history route, otherwise from the local tips frame.
+    """
+    event_types = get_tip_cache().event_types()
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        _range = st.date_input("Date Range", value=(), max_value=before - timedelta(days=1), key="previous_tips_range")
+    with c2:
+        event_type = st.selectbox("Event Type", event_types, index=None, key="previous_tips_event_type")
+    with c3:
+        page_size = st.selectbox("Page Size", [25, 50, 100, 250], index=1, key="previous_tips_page_size")
+    
+    # A date range is (start,) while picking, (start, end) once done
+    date_from = datetime.combine(_range[0], datetime.min.time()) if len(_range) > 0 else None
+    date_to = datetime.combine(_range[1], datetime.min.time()) + timedelta(days=1) if len(_range) > 1 else before
+    date_to = min(date_to, before)
+    
+    # Back to the first page whenever the filters change, the current one may no longer exist
+    filters = (tuple(_range), event_type, page_size)
+    if st.session_state.get("previous_tips_filters") != filters:
+        st.session_state["previous_tips_filters"] = filters
+        st.session_state["previous_tips_page"] = 1
+    
+    with c4:
+        page = st.number_input("Page", min_value=1, step=1, key="previous_tips_page")
+    
+    if api_supports("hunch_club/tips/history", "GET"):
+        previous_tips, total = get_tips_page(page, page_size, date_from, date_to, event_type)
+    else:
+        previous_tips, total = page_tips(tips, page, page_size, date_from, date_to, event_type)
+    if previous_tips is None:
+        return
+    
+    st.caption(f"Page {page} of {max(1, -(-total // page_size))} ({total} tips)")
+    st.dataframe(previous_tips, use_container_width=True, hide_index=True, column_config={
+        "_id" : None,
+        "datetime" : st.column_config.DatetimeColumn(label="Date", format="YYYY.MM.DD, HH:mm"),
+
+    }, column_order=TIP_GRID_COLUMN_ORDER)
+
+
+@fragment
+def tip_grid(key:str, tips:pd.DataFrame, column_config:dict, disabled=()):
+    """
+    An editable tips grid with its Save Changes button. Runs as a fragment, so editing a cell reruns
+    only this grid. tips is a slice of the snapshot taken by the last full run.
+        key: str = Widget key of the grid, its button is key+"_button".
+        column_config: dict = Column labels and types, e.g. UPCOMING_TIP_COLUMNS or RESULT_TIP_COLUMNS.
+        disabled: tuple = Read-only columns.
+    """
+    st.data_editor(tips, key=key, use_container_width=True, hide_index=True, column_config=column_config, disabled=disabled, column_order=TIP_GRID_COLUMN_ORDER)
+    edited_rows = st.session_state.get(key, {}).get("edited_rows", {})
+    if edited_rows:
+        if st.button("Save Changes", use_container_width=True, type="primary", key=f"{key}_button"):
+            update_tips(edited_rows, tips)
 
 
-def update_tips(edited_rows:dict, dataset:list):
+def update_tips(edited_rows:dict, dataset:pd.DataFrame):
+    """
+    Saves all edited rows of a tips grid concurrently, then reruns as soon as the last write lands.
+    Per-row failures are reported on the next run.
+        edited_rows: dict = The data editor's edited_rows, {row position: changes}.
+        dataset: pd.DataFrame = Tips the data editor was given, in the same row order.
+    """
     if edited_rows:
         # st.write(edited_rows)
-        errors = []
-        for index, row in edited_rows.items():
-            # print(index, row, dataset[index])
-            try:
-                row_id = dataset[index]['id']
-                if update_tip(row_id, row):
-                    # st.success(f"Updated Tip {index}")
-                    pass
-                else:
-                    # st.error(f"Error updating Tip {index}")
-                    errors.append("Error updating Tip {row_id}")
-            except Exception as e:
-                log.error(e)
-                st.error(str(e))
-            pass
-        # st.session_state['edit_tips_1']['edited_rows'] = {}
-        st.balloons()
-        get_tips.clear()
+        jobs = {dataset['id'].iloc[index]: row for index, row in edited_rows.items()}
+        
+        progress = st.progress(0.0, text="Saving tips...")
+        results = batch_update_tips(jobs)
+        if results is None:
+            # Server has no batch route, fall back to concurrent per-row PATCHes
+            results = bulk_apply(patch_tip, jobs, on_progress=lambda done, total: progress.progress(done / total, text=f"Saved {done}/{total} tips"))
+        
+        errors = [f"Error updating Tip {row_id}: {error}" for row_id, (ok, error) in results.items() if not ok]
+        # Apply the saved rows to the cache, no need for a full reload
+        get_tip_cache().apply_local({row_id: _editable_fields(jobs[row_id]) for row_id, (ok, _) in results.items() if ok})
         if errors:
-            st.error("\n".join(errors))
+            flash(f"Updated {len(results) - len(errors)}/{len(results)} tips", "warning")
+            flash("\n\n".join(errors), "error")
         else:
-            st.success(":white_check_mark: Tips Updated")
-        sleep(3)
+            flash(kind="balloons")
+            flash(f":white_check_mark: {len(results)} Tips Updated")
         st.rerun()
 
 
-def update_tip(id:str, tip:dict):
+def batch_update_tips(jobs:dict):
     """
-    Updates a tip in the database.
+    Saves {tip_id: changes} through the hunch_club/tips/batch route, TIPS_BATCH_SIZE items per request.
+    Request:  PATCH {"items": [{"id": str, "data": dict}, ...]}
+    Response: {"data": [{"id": str, "success": bool, "error": str|None}, ...]}
+    Returns {tip_id: (ok, error)}, or None if the server does not support batch writes.
     """
-    try:
-        # Drop some fields
-        # st.write(tip)
-        tip.pop('datetime', None)
-        tip.pop('participants', None)
-        tip.pop('event_type', None)
-        
-        res = server_request(f"hunch_club/tips/{id}", method="PATCH", data=tip)
-        if res.status_code == 200:
-            return True
-        else:
-            st.error(f"Error updating tip: {res.status_code} {res.text}")
-        
-    except Exception as e:
-        log.error(e)
-        st.error(str(e))
+    if not api_supports("hunch_club/tips/batch", "PATCH"):
+        return None
+    
+    results = {}
+    items = [{"id": id, "data": _editable_fields(tip)} for id, tip in jobs.items()]
+    for i in range(0, len(items), TIPS_BATCH_SIZE):
+        chunk = items[i:i + TIPS_BATCH_SIZE]
+        try:
+            res = server_request("hunch_club/tips/batch", method="PATCH", data={"items": chunk}, idempotency_key=str(uuid4()))
+            if res is None:
+                raise Exception("No response from server")
+            if res.status_code in [404, 405] and not results:
+                # Route advertised but not served (e.g. stale schema), use per-row writes instead
+                return None
+            if res.status_code not in [200, 207]:
+                raise Exception(f"{res.status_code} {res.text}")
+            for item in res.json().get('data', []):
+                results[item['id']] = (bool(item.get('success')), item.get('error'))
+        except Exception as e:
+            log.error(e)
+            for item in chunk:
+                results.setdefault(item['id'], (False, str(e)))
         
-    return None
+    # Items the server did not report on are treated as failed
+    for id in jobs:
+        results.setdefault(id, (False, "Missing from batch response"))
+    return results
+
+
+def _editable_fields(tip:dict):
+    """
+    Drops the fields that are read-only on the server.
+    """
+    return {k: v for k, v in tip.items() if k not in ['datetime', 'participants', 'event_type']}
+
+
+def patch_tip(id:str, tip:dict):
+    """
+    Sends a tip update to the API. Raises on failure, safe to call from worker threads.
+    """
+    res = server_request(f"hunch_club/tips/{id}", method="PATCH", data=_editable_fields(tip), idempotency_key=str(uuid4()))
+    if res is None:
+        raise Exception("No response from server")
+    if res.status_code != 200:
+        raise Exception(f"{res.status_code} {res.text}")
+    return True
+
 
 if __name__ == "__main__":
 
@@ -112,13 +268,10 @@ if __name__ == "__main__":
     
     tips = get_tips()
     
-    if not tips:
+    if tips.empty:
         st.warning("No tips found.")
-        get_tips.clear()
+        get_tip_cache().invalidate()
     else:
-        # Sort tips by datetime in reverse order
-        tips = sorted(tips, key=lambda x: x['datetime'], reverse=True)
-        
         # TODO For Future Tips (today, tomorrow, future) - allow for deletion of tips (in case of duplicates)
         _now = datetime.utcnow()
         
@@ -130,142 +283,28 @@ if __name__ == "__main__":
         today = datetime(_now.year, _now.month, _now.day)
         tomorrow = datetime(_tomorrow.year, _tomorrow.month, _tomorrow.day)
         
-        st.subheader("Future Tips", divider=True)
-        # Filter all tips results before yesterday
-        # tip['datetime'] is a datetime object. 
-
-        # print(tips[0]['datetime'])
-        future_tips = [tip for tip in tips if tip['datetime'] > datetime(tomorrow.year, tomorrow.month,tomorrow.day, hour=23, minute=59) ]
-        st.data_editor(future_tips, key="edit_tips_future", use_container_width=True, column_config={
-                "_id" : None,
-                "datetime" : st.column_config.DatetimeColumn(label="Date", format="YYYY.MM.DD, HH:mm"),
-                "participants" : "Participants",
-                "event_name" : "Event Name",
-                "event_type" : "Event Type",
-                "market_type": "Market Type",
-                "selection" : "Selection",
-                "odds" : "Odds",
-                "event_result" : None,
-                "bet_result" : None,
-                "publish_free": st.column_config.CheckboxColumn(label="Free Tip"),
-                "publish_vip": st.column_config.CheckboxColumn(label="Premium Tip"),
-            }, disabled=("datetime", "participants","event_type"),
-            column_order=("datetime",  "event_type", "event_name", "participants",  "publish_free", "publish_vip", "event_result", "bet_result", "market_type", "selection", "odds", "description")
-        )
-        edited_rows = st.session_state.get("edit_tips_future", {}).get("edited_rows", {}) 
-        if edited_rows:
-            if st.button("Save Changes", use_container_width=True, type="primary", key="edit_tips_future_button"):
-                update_tips(edited_rows, future_tips)
-               
-        # Drop columns: _id, language
-        # for tip in tips:
-        #     # tip.pop('_id', None)
-        #     # tip.pop('language', None)
-        #     # Reformat datetime 
-        #     try:
-        #         # tip['datetime'] = datetime.strptime(tip['datetime'], "%Y-%m-%d %H:%M:%S")
-
-        #         # Change the format to "YYYY-MM-DD HH:MM"
-        #         tip['datetime'] = tip['datetime'].strftime("%Y-%m-%d, %H:%M")
-        #     except:
-        #         pass
+        # Read from the cache's day index, rebuilt only when tips change or the UTC day rolls over
+        buckets = get_tip_cache().buckets(_now)
         
-        # tomorrow = (datetime.utcnow() + timedelta(days=1)).strftime("%Y-%m-%d")
-        # today = datetime.utcnow().strftime("%Y-%m-%d")
-        # yesterday = (datetime.utcnow() - timedelta(days=1)).strftime("%Y-%m-%d")
+        st.subheader("Future Tips", divider=True)
+        tip_grid("edit_tips_future", buckets['future'], UPCOMING_TIP_COLUMNS, disabled=("datetime", "participants","event_type"))
 
-        
-        # print(datetime(tomorrow.year, tomorrow.month, tomorrow.day), today, yesterday)
-        
-        # Tips for tomorrow only
-        # tomorrow_tips = [tip for tip in tips if tip['datetime'].startswith(tomorrow)]
-        tomorrow_tips = [tip for tip in tips if datetime(tip['datetime'].year, tip['datetime'].month,tip['datetime'].day) == tomorrow ]
+        tomorrow_tips = buckets['tomorrow']
         st.subheader(f"Tomorrow's Tips ({len(tomorrow_tips)}) - {tomorrow.strftime('%Y.%m.%d')}", divider=True)
-        st.data_editor(tomorrow_tips, key="edit_tips_tomorrow", use_container_width=True, column_config={
-                "_id" : None,
-                "datetime" : st.column_config.DatetimeColumn(label="Date", format="YYYY.MM.DD, HH:mm"),
-                "participants" : "Participants",
-                "event_name" : "Event Name",
-                "event_type" : "Event Type",
-                "market_type": "Market Type",
-                "selection" : "Selection",
-                "odds" : "Odds",
-                "event_result" : None,
-                "bet_result" : None,
-                "publish_free": st.column_config.CheckboxColumn(label="Free Tip"),
-                "publish_vip": st.column_config.CheckboxColumn(label="Premium Tip"),
-            }, disabled=("datetime", "participants","event_type"),
-            column_order=("datetime",  "event_type", "event_name", "participants",  "publish_free", "publish_vip", "event_result", "bet_result", "market_type", "selection", "odds", "description")
-        )
-        edited_rows = st.session_state.get("edit_tips_tomorrow", {}).get("edited_rows", {}) 
-        if edited_rows:
-            if st.button("Save Changes", use_container_width=True, type="primary", key="edit_tips_tomorrow_button"):
-                update_tips(edited_rows, tomorrow_tips)
-
-
-        # Tips for today only
-        # todays_tips = [tip for tip in tips if tip['datetime'].startswith(today)]
-        todays_tips = [tip for tip in tips if datetime(tip['datetime'].year, tip['datetime'].month,tip['datetime'].day) == today]
+        tip_grid("edit_tips_tomorrow", tomorrow_tips, UPCOMING_TIP_COLUMNS, disabled=("datetime", "participants","event_type"))
 
+        todays_tips = buckets['today']
         st.subheader(f"Today's Tips ({len(todays_tips)}) - {today.strftime('%Y.%m.%d')}", divider=True)
-        st.data_editor(todays_tips, key="edit_tips_today", use_container_width=True, column_config={
-                "_id" : None,
-                "datetime" : st.column_config.DatetimeColumn(label="Date", format="YYYY.MM.DD, HH:mm"),
-                "participants" : "Participants",
-                "event_name" : "Event Name",
-                "event_type" : "Event Type",
-                "market_type": "Market Type",
-                "selection" : "Selection",
-                "odds" : "Odds",
-                "event_result" : None,
-                "bet_result" : None,
-                "publish_free": st.column_config.CheckboxColumn(label="Free Tip"),
-                "publish_vip": st.column_config.CheckboxColumn(label="Premium Tip"),
-            }, disabled=("datetime", "participants","event_type"),
-            column_order=("datetime",  "event_type", "event_name", "participants",  "publish_free", "publish_vip", "event_result", "bet_result", "market_type", "selection", "odds", "description")
-        )
-        edited_rows = st.session_state.get("edit_tips_today", {}).get("edited_rows", {}) 
-        if edited_rows:
-            if st.button("Save Changes", use_container_width=True, type="primary", key="edit_tips_today_button"):
-                update_tips(edited_rows, todays_tips)
-
-        # Tips for yesterday
-        # yesterdays_tips = [tip for tip in tips if tip['datetime'].startswith(yesterday)]
-        yesterdays_tips = [tip for tip in tips if datetime(tip['datetime'].year, tip['datetime'].month,tip['datetime'].day) == yesterday]
+        tip_grid("edit_tips_today", todays_tips, UPCOMING_TIP_COLUMNS, disabled=("datetime", "participants","event_type"))
 
+        yesterdays_tips = buckets['yesterday']
         st.subheader(f"Yesterday's Tips ({len(yesterdays_tips)}) - {yesterday.strftime('%Y.%m.%d')}", divider=True)
-        st.data_editor(yesterdays_tips, key="edit_tips_yesterday", use_container_width=True, hide_index=True, disabled=("datetime", "participants","odds","selection","event_type","event_name"), column_config={
-                    "_id" : None,
-                    "description" : None,
-                    "datetime" : st.column_config.DatetimeColumn(label="Date", format="YYYY.MM.DD, HH:mm"),
-                    "participants" : "Participants",
-                    "event_name" : "Event Name",
-                    "event_type" : "Event Type",
-                    "market_type": "Market Type",
-                    "selection" : "Selection",
-                    "odds" : "Odds",
-                    "event_result" : "Event Result",
-                    "bet_result" :st.column_config.SelectboxColumn(label="Bet Result", options=["Win", "Lose", "Void"]),
-                    "publish_free": st.column_config.CheckboxColumn(label="Free Tip", disabled=True),
-                    "publish_vip": st.column_config.CheckboxColumn(label="Premium Tip", disabled=True),
-                }, column_order=("datetime",  "event_type", "event_name", "participants",  "publish_free", "publish_vip", "event_result", "bet_result", "market_type", "selection", "odds", "description")
-        )
-        edited_rows = st.session_state.get("edit_tips_yesterday", {}).get("edited_rows", {}) 
-        if edited_rows:
-            if st.button("Save Changes", use_container_width=True, type="primary", key="edit_tips_yesterday_button"):
-                update_tips(edited_rows, yesterdays_tips)
-
+        tip_grid("edit_tips_yesterday", yesterdays_tips, RESULT_TIP_COLUMNS, disabled=("datetime", "participants","odds","selection","event_type","event_name"))
 
         st.subheader("Previous Tips", divider=True)
-        # Filter all tips results before yesterday
-        previous_tips = [tip for tip in tips if tip['datetime'] < yesterday]
-        # previous_tips = [tip for tip in tips if tip['datetime'].startswith(yesterday)]
-        
-        st.dataframe(previous_tips, use_container_width=True, column_config={
-            "_id" : None,
-            "datetime" : st.column_config.DatetimeColumn(label="Date", format="YYYY.MM.DD, HH:mm"),
+        show_previous_tips(tips, yesterday)
 
-        }, column_order=("datetime",  "event_type", "event_name", "participants",  "publish_free", "publish_vip", "event_result", "bet_result", "market_type", "selection", "odds", "description"))
+    footer()
 
 
     # if DEBUG:
@@ -1,9 +1,13 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, AliasChoices, TypeAdapter, ValidationError
+from contextlib import contextmanager
 import datetime as dt
+import gc
 from typing import List, Optional
+import pyarrow as pa
 
 class TipSchema(BaseModel):
-    id: str = ""
+    # The API sends "_id", the admin uses "id"
+    id: str = Field("", validation_alias=AliasChoices("id", "_id"))
     datetime: dt.datetime = dt.datetime.utcnow()
     participants: list = []
     event_name: str = ""
@@ -17,4 +21,94 @@ class TipSchema(BaseModel):
     bet_result: str = ""
     odds_url: str = ""
     publish_free: bool = False
-    publish_vip: bool = False
\ No newline at end of file
+    publish_vip: bool = False
+
+
+TipListAdapter = TypeAdapter(List[TipSchema])
+
+# Arrow type each TipSchema field is read as from the API's Arrow IPC format, when the column has another type
+TIP_ARROW_TYPES = {
+    "id": pa.string(),
+    "datetime": pa.timestamp("us"),
+    "event_name": pa.string(),
+    "event_type": pa.string(),
+    "market_type": pa.string(),
+    "selection": pa.string(),
+    "odds": pa.float64(),
+    "description": pa.string(),
+    "language": pa.string(),
+    "event_result": pa.string(),
+    "bet_result": pa.string(),
+    "odds_url": pa.string(),
+    "publish_free": pa.bool_(),
+    "publish_vip": pa.bool_(),
+}
+
+
+@contextmanager
+def gc_paused():
+    """
+    Pauses the cyclic garbage collector while building many small objects at once.
+    Otherwise every few hundred allocations trigger a collection that walks the whole payload.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled: gc.enable()
+
+
+def decode_tips(data:list):
+    """
+    Validates a list of raw API tips in one pass and returns them as plain dicts.
+    Datetimes ("YYYY-MM-DD HH:MM:SS" or ISO) are parsed by pydantic's native parser.
+    Malformed rows are skipped rather than failing the whole payload.
+    Returns (tips, errors) where errors is a list of (row index, message).
+    """
+    with gc_paused():
+        try:
+            return TipListAdapter.dump_python(TipListAdapter.validate_python(data)), []
+        except ValidationError as e:
+            errors = [(err['loc'][0], ": ".join(filter(None, [".".join(str(l) for l in err['loc'][1:]), err['msg']]))) for err in e.errors()]
+
+        bad = {index for index, _ in errors}
+        good = [tip for index, tip in enumerate(data) if index not in bad]
+        return TipListAdapter.dump_python(TipListAdapter.validate_python(good)), errors
+
+
+
+def decode_tip_batch(batch:pa.RecordBatch):
+    """
+    Converts an Arrow record batch of tips (hunch_club/tips/all as Arrow IPC) to the same dicts as decode_tips,
+    straight from the typed columns: no JSON parsing and no per-row validation.
+    Columns are matched to TipSchema by name ("_id" is read as "id"); missing columns and nulls get the schema default.
+    Returns (tips, errors) where errors is a list of (row index, message) for rows that cannot be used.
+    """
+    names = batch.schema.names
+    columns = {}
+    with gc_paused():
+        for name, field in TipSchema.model_fields.items():
+            # Lists are per row, not the schema's shared default
+            default = (lambda: list(field.default)) if isinstance(field.default, list) else (lambda: field.default)
+            source = name if name in names else "_id" if name == "id" and "_id" in names else None
+            if source is None:
+                columns[name] = [default() for _ in range(batch.num_rows)]
+                continue
+            column = batch.column(source)
+            arrow_type = TIP_ARROW_TYPES.get(name)
+            if arrow_type is not None and column.type != arrow_type and not (name == "datetime" and pa.types.is_timestamp(column.type)):
+                try:
+                    column = column.cast(arrow_type)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                    return [], [(index, f"{name}: {e}") for index in range(batch.num_rows)]
+            values = column.to_pylist()
+            if column.null_count and field.default is not None:
+                values = [default() if value is None else value for value in values]
+            columns[name] = values
+
+        tips = [dict(zip(columns, row)) for row in zip(*columns.values())]
+    errors = [(index, "id: Field required") for index, tip in enumerate(tips) if not tip['id']]
+    if errors:
+        tips = [tip for tip in tips if tip['id']]
+    return tips, errors
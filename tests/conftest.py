@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+# core.vars reads st.secrets on import, and Streamlit looks for .streamlit/secrets.toml in the working
+# directory. Run the tests from a scratch app folder so they never pick up real settings or caches.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_workdir = tempfile.mkdtemp(prefix="admin-tests-")
+os.makedirs(os.path.join(_workdir, ".streamlit"))
+with open(os.path.join(_workdir, ".streamlit", "secrets.toml"), "w") as f:
+    f.write('API_SERVER_ADDRESS = "http://127.0.0.1:9/"\nDEBUG = false\nAPP_PASSWORD = "test"\nAPI_TOKEN = "test"\nSNAPSHOT_DIR = ""\n')
+os.chdir(_workdir)
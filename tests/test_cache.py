@@ -0,0 +1,53 @@
+import sqlite3
+import time
+
+from core import cache as cache_module
+from core.cache import Cache, MemoryBackend, SQLiteBackend
+
+
+def test_fetch_keeps_other_replicas_lease(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module.time, "sleep", lambda seconds: None)
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite"))
+    assert backend.acquire("k|", 30)
+    # Gives up waiting on the other replica and fetches itself, but the lease is still theirs
+    assert Cache(backend).get_or_fetch("k|", lambda: "value", ttl=60) == "value"
+    assert not backend.acquire("k|", 30)
+
+
+def test_fetch_releases_own_lease(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite"))
+    Cache(backend).get_or_fetch("k|", lambda: "value", ttl=60)
+    assert backend.acquire("k|", 30)
+
+
+def test_sqlite_expired_rows_are_skipped_and_swept(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite"))
+    now = time.time()
+    backend.set("old|", "a", now - 100, 10)
+    backend.set("new|", "b", now, 10)
+    assert backend.get("old|") is None
+    assert backend.get("new|") == ("b", now)
+    backend.next_sweep = 0
+    backend.set("other|", "c", now, 10)
+    keys = [row[0] for row in backend._conn().execute("SELECT key FROM cache")]
+    assert sorted(keys) == ["new|", "other|"]
+
+
+def test_sqlite_adds_expires_to_old_files(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, value BLOB, stored_at REAL)")
+    conn.commit()
+    conn.close()
+    backend = SQLiteBackend(path)
+    backend.set("k|", "value", time.time(), 10)
+    assert backend.get("k|")[0] == "value"
+
+
+def test_memory_expired_entries_are_dropped():
+    backend = MemoryBackend()
+    now = time.time()
+    backend.set("old|", "a", now - 100, 10)
+    backend.set("keep|", "b", now - 100)
+    assert backend.get("old|") is None and "old|" not in backend.entries
+    assert backend.get("keep|") == ("b", now - 100)
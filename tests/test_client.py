@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from core.client import iter_json_array
+
+
+def split_at(payload:bytes, offset):
+    return [payload[:offset], payload[offset:]]
+
+
+def chunked(payload:bytes, size):
+    return [payload[i:i + size] for i in range(0, len(payload), size)]
+
+
+PAYLOADS = [
+    {"data": [12345, -0.5]},
+    {"data": [1.5e10, -2E-3, 0, 1]},
+    {"data": [{"id": "a", "odds": 1.85, "tags": ["x", "é"]}, {"id": "b", "odds": -0.0}], "total": 1234.5},
+    {"total": 1234.5, "next": None, "data": [True, False, None, "1.5e3"], "page": 10},
+    {"data": []},
+    {},
+]
+
+
+@pytest.mark.parametrize("obj", PAYLOADS)
+def test_every_split_offset(obj):
+    payload = json.dumps(obj, ensure_ascii=False).encode()
+    for offset in range(len(payload) + 1):
+        assert list(iter_json_array(split_at(payload, offset))) == obj.get("data", []), offset
+
+
+@pytest.mark.parametrize("obj", PAYLOADS)
+@pytest.mark.parametrize("size", [1, 2, 3, 7])
+def test_small_chunks(obj, size):
+    payload = json.dumps(obj, indent=1, ensure_ascii=False).encode()
+    assert list(iter_json_array(chunked(payload, size))) == obj.get("data", [])
+
+
+@pytest.mark.parametrize("payload", [b'{"data": [1, 2', b'{"data": [1.5e', b'{"data": [1 2]}', b'{"data": {"a": 1}}'])
+def test_malformed(payload):
+    for offset in range(len(payload) + 1):
+        with pytest.raises(ValueError):
+            list(iter_json_array(split_at(payload, offset)))
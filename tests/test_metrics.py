@@ -0,0 +1,23 @@
+from core.metrics import Metrics
+
+
+def test_render_mixed_status_labels():
+    metrics = Metrics()
+    metrics.inc("http_requests_total", endpoint="GET hunch_club/platforms", status=200)
+    metrics.inc("http_requests_total", endpoint="GET hunch_club/platforms", status="timeout")
+    metrics.observe("http_request_duration_seconds", 0.1, endpoint="GET hunch_club/platforms", status=503)
+    metrics.observe("http_request_duration_seconds", 0.2, endpoint="GET hunch_club/platforms", status="circuit_open")
+
+    text = metrics.render()
+    assert 'status="200"} 1' in text
+    assert 'status="timeout"} 1' in text
+    counters, histograms = metrics.snapshot()
+    assert len(counters) == 2 and len(histograms) == 2
+
+
+def test_same_series_for_int_and_str_label():
+    metrics = Metrics()
+    metrics.inc("http_requests_total", endpoint="x", status=200)
+    metrics.inc("http_requests_total", endpoint="x", status="200")
+    counters, _ = metrics.snapshot()
+    assert list(counters.values()) == [2]
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from core.tips import TipCache
+
+
+def tip(id, event_type):
+    return {"id": id, "datetime": datetime(2024, 1, 1), "event_type": event_type}
+
+
+def test_event_types_follow_cache_version():
+    cache = TipCache()
+    cache.tips = {"a": tip("a", "Soccer"), "b": tip("b", None), "c": tip("c", "Basketball"), "d": tip("d", "Soccer")}
+    cache.version = 1
+    assert cache.event_types() == ["Basketball", "Soccer"]
+    cache.apply_local({"b": {"event_type": "Tennis"}})
+    assert cache.event_types() == ["Basketball", "Soccer", "Tennis"]